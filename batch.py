@@ -0,0 +1,145 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import schedule
+from flowshop import FlowShopInstance
+from johnson import Johnson
+
+# Johnson's rules over many small 2 and 3 machines instances at once. Instances are padded to a common
+# (batch, n, m) array, the mask tells the jobs from the padding. Rules, condition checks and makespans
+# take a few array passes for the whole batch, only the instances that need an exact search are solved
+# one by one by Johnson.optimize.
+
+
+def pad_instances(instances):
+    # (batch, n, m) processing times and (batch, n) mask of a list of (n_i, m) matrices
+    instances = [np.asarray(i, dtype=float) for i in instances]
+    if len(instances) == 0:
+        raise Exception('Data list is empty')
+    if any(i.ndim != 2 for i in instances):
+        raise Exception('Processing times must be a 2D matrix')
+    machines_count = instances[0].shape[1]
+    if any(i.shape[1] != machines_count for i in instances):
+        raise Exception('Undefined units count')
+    jobs_count = max(len(i) for i in instances)
+    processing = np.zeros((len(instances), jobs_count, machines_count))
+    mask = np.zeros((len(instances), jobs_count), dtype=bool)
+    for b, times in enumerate(instances):
+        processing[b, :len(times)] = times
+        mask[b, :len(times)] = True
+    return processing, mask
+
+
+def batch_johnson_order(first, second, mask):
+    # johnson_order of every row, padding jobs go last; (batch, n) job indexes
+    head = first <= second
+    group = np.where(mask, np.where(head, 0, 1), 2)
+    value = np.where(head, first, -second)
+    index = np.broadcast_to(np.arange(first.shape[1]), first.shape)
+    return np.lexsort((index, value, group), axis=-1)
+
+
+def batch_swap_sort_order(first, second, mask):
+    # schedule.swap_sort_order of every row, the rows with ties are sorted one by one
+    order = batch_johnson_order(first, second, mask)
+    for b in np.flatnonzero(((first == second) & mask).any(axis=1)):
+        jobs = np.flatnonzero(mask[b])
+        order[b, :len(jobs)] = jobs[schedule.swap_sort_order(first[b, jobs], second[b, jobs])]
+    return order
+
+
+def solve_batch(processing, mask=None, alter_method=False, exact_method='branch_and_bound', workers=1,
+                **options):
+    # Johnson.optimize for every instance of a padded (batch, n, m) array, m being 2 or 3.
+    # mask (batch, n) marks the jobs of every instance, all of them by default; jobs of zero times are
+    # jobs as well, they are kept in the sequences. Sequences index the job axis of the padded array
+    # and end with -1 for the padding. exact_method None keeps the order of the rule as optimize does.
+    # Instances without Johnson's conditions go to Johnson.optimize with the options (time_limit,
+    # node_limit, ...), in a pool of worker processes when workers is more than 1
+    processing = np.asarray(processing, dtype=float)
+    if processing.ndim != 3:
+        raise Exception('Processing times must be a (batch, n, m) array')
+    batch_count, jobs_count, machines_count = processing.shape
+    if machines_count not in (2, 3):
+        raise Exception('Undefined units count')
+    if mask is None:
+        mask = np.ones((batch_count, jobs_count), dtype=bool)
+    mask = np.asarray(mask, dtype=bool)
+    if mask.shape != (batch_count, jobs_count):
+        raise Exception('Mask must be a (batch, n) matrix')
+    if workers is not None and workers < 1:
+        raise Exception('Workers count must be positive')
+    if options.get('improvement'):
+        raise Exception('Improvement is not available for batches')
+    # Padding keeps no times, so it adds nothing to the makespans and idle times
+    processing = np.where(mask[:, :, None], processing, 0.0)
+    times = [processing[:, :, k] for k in range(machines_count)]
+    rule = np.empty(batch_count, dtype=object)
+
+    if machines_count == 2:
+        sequences = batch_johnson_order(times[0], times[1], mask)
+        rule[:] = 'two_machines'
+        proven = np.ones(batch_count, dtype=bool)
+    else:
+        max_2nd_machine = np.where(mask, times[1], -np.inf).max(axis=1)
+        first_condition = np.where(mask, times[0], np.inf).min(axis=1) >= max_2nd_machine
+        third_condition = np.where(mask, times[2], np.inf).min(axis=1) >= max_2nd_machine
+        if alter_method:
+            sequences = batch_johnson_order(times[0] + times[1], times[1] + times[2], mask)
+            rule[:] = 'alternative'
+            proven = first_condition | third_condition
+        else:
+            first_order = batch_swap_sort_order(times[0] + times[1], times[2], mask)
+            third_order = batch_swap_sort_order(times[0], times[1] + times[2], mask)
+            # Without the conditions and the exact search the shorter of both orders is kept
+            shorter = (schedule.evaluate_batch(_ordered(processing, first_order))[0] <=
+                       schedule.evaluate_batch(_ordered(processing, third_order))[0])
+            use_first = first_condition | ~third_condition & shorter
+            sequences = np.where(use_first[:, None], first_order, third_order)
+            rule[:] = np.where(first_condition, 'first_condition', 'third_condition')
+            # These surrogate times are not exact even under the conditions
+            proven = np.zeros(batch_count, dtype=bool)
+        exact = ~(first_condition | third_condition)
+        rule[exact] = 'exact'
+    makespans, idle = schedule.evaluate_batch(_ordered(processing, sequences))
+    lower_bounds = np.where(proven, makespans, schedule.lower_bounds(processing, mask))
+    nodes = np.zeros(batch_count, dtype=int)
+    stopped = np.zeros(batch_count, dtype=bool)
+
+    fallback = np.flatnonzero(rule == 'exact') if exact_method is not None else np.empty(0, dtype=int)
+    if len(fallback):
+        tasks = [(processing[b][mask[b]], alter_method, exact_method, options) for b in fallback]
+        if workers == 1 or len(tasks) == 1:
+            results = [_solve_instance(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(workers) as executor:
+                results = list(executor.map(_solve_instance, *zip(*tasks)))
+        for b, (sequence, lower_bound, count, cut) in zip(fallback, results):
+            jobs = np.flatnonzero(mask[b])
+            sequences[b, :len(jobs)] = jobs[sequence]
+            lower_bounds[b] = lower_bound
+            nodes[b] = count or 0
+            stopped[b] = cut
+        makespans[fallback], idle[fallback] = schedule.evaluate_batch(_ordered(processing[fallback],
+                                                                               sequences[fallback]))
+    sequences = np.where(np.sort(~mask, axis=1), -1, sequences)
+    return {
+        'sequence': sequences,
+        'makespan': makespans,
+        'sum_delay': idle,
+        'lower_bound': lower_bounds,
+        'optimal': lower_bounds >= makespans,
+        'rule': rule,
+        'nodes': nodes,
+        'stopped': stopped,
+        'fallback': fallback
+    }
+
+
+def _ordered(processing, sequences):
+    return np.take_along_axis(processing, sequences[:, :, None], axis=1)
+
+
+def _solve_instance(processing, alter_method, exact_method, options):
+    # Runs in a worker process as well, only the numbers needed are sent back
+    opt = Johnson(FlowShopInstance(processing)).optimize(alter_method, exact_method, **options)
+    return opt['sequence'], opt['lower_bound'], opt.get('nodes'), bool(opt.get('stopped'))
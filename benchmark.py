@@ -0,0 +1,190 @@
+import argparse
+import json
+import math
+import statistics
+import sys
+import time
+import tracemalloc
+import numpy as np
+import schedule
+from flowshop import FlowShopInstance
+from johnson import Johnson
+
+
+def taillard_instance(jobs_count, machines_count, seed):
+    # Taillard's (1993) generator: Lehmer's LCG, times in [1, 99] drawn machine by machine
+    processing = np.empty((jobs_count, machines_count))
+    for k in range(machines_count):
+        for j in range(jobs_count):
+            seed = 16807 * (seed % 127773) - (seed // 127773) * 2836
+            if seed < 0:
+                seed += 2147483647
+            processing[j, k] = 1 + int(seed / 2147483647 * 99)
+    return FlowShopInstance(processing)
+
+
+def random_instance(jobs_count, machines_count, seed, kind='uniform'):
+    rng = np.random.default_rng(seed)
+    processing = rng.integers(1, 100, size=(jobs_count, machines_count)).astype(float)
+    if kind == 'dominant_first':
+        # min of the 1st machine not less than max of the 2nd one
+        processing[:, 0] = rng.integers(50, 100, size=jobs_count)
+        processing[:, 1] = rng.integers(1, 51, size=jobs_count)
+    elif kind == 'dominant_last':
+        processing[:, 1] = rng.integers(1, 51, size=jobs_count)
+        processing[:, 2] = rng.integers(50, 100, size=jobs_count)
+    elif kind != 'uniform':
+        raise Exception('Undefined instance kind')
+    return FlowShopInstance(processing)
+
+
+# Solver paths: instance generator and the measured call
+CASES = {
+    'two_machines': (lambda n, seed: random_instance(n, 2, seed),
+                     lambda instance: Johnson(instance).optimize(False)),
+    'three_machines_ordinary': (lambda n, seed: random_instance(n, 3, seed, 'dominant_first' if seed % 2 else
+                                                                'dominant_last'),
+                                lambda instance: Johnson(instance).optimize(False)),
+    'three_machines_alternative': (lambda n, seed: random_instance(n, 3, seed, 'dominant_first'),
+                                   lambda instance: Johnson(instance).optimize(True)),
+    'exact_fallback': (lambda n, seed: taillard_instance(n, 3, seed),
+                       lambda instance: Johnson(instance).optimize(False)),
+    'dynamic_programming': (lambda n, seed: taillard_instance(n, 3, seed),
+                            lambda instance: Johnson(instance).optimize(False, 'dynamic_programming')),
+    'neh': (lambda n, seed: taillard_instance(n, 10, seed),
+            lambda instance: Johnson(instance).optimize(False, method='neh')),
+    'cds': (lambda n, seed: taillard_instance(n, 10, seed),
+            lambda instance: Johnson(instance).optimize(False, method='cds')),
+    'iterated_greedy': (lambda n, seed: taillard_instance(n, 5, seed),
+                        lambda instance: Johnson(instance).optimize(False, improvement='iterated_greedy',
+                                                                    iterations=20, seed=0)),
+    'trace': (lambda n, seed: random_instance(n, 3, seed),
+              lambda instance: Johnson(instance).get_original_params().to_dict()),
+    'completion_times': (lambda n, seed: random_instance(n, 3, seed),
+                         lambda instance: schedule.completion_times(instance.processing))
+}
+
+GRIDS = {
+    'default': {
+        'two_machines': [100, 1000, 10000, 100000],
+        'three_machines_ordinary': [100, 1000, 10000, 100000],
+        'three_machines_alternative': [100, 1000, 10000, 100000],
+        'exact_fallback': [6, 8, 10, 12],
+        'dynamic_programming': [10, 12, 14, 16],
+        'neh': [50, 100, 200, 500],
+        'cds': [100, 1000, 10000, 100000],
+        'iterated_greedy': [20, 50, 100],
+        'trace': [100, 1000, 10000, 100000],
+        'completion_times': [100, 1000, 10000, 100000, 1000000]
+    },
+    'quick': {
+        'two_machines': [100, 1000, 10000],
+        'three_machines_ordinary': [100, 1000, 10000],
+        'three_machines_alternative': [100, 1000, 10000],
+        'exact_fallback': [6, 8],
+        'dynamic_programming': [10, 12],
+        'neh': [50, 100],
+        'cds': [100, 1000],
+        'iterated_greedy': [20],
+        'trace': [100, 1000, 10000],
+        'completion_times': [100, 1000, 10000]
+    }
+}
+
+
+def measure(case, jobs_count, repeats=5, seed=12345):
+    make_instance, solve = CASES[case]
+    # Warm-up run keeps first-call costs (imports, caches) out of the timings
+    solve(make_instance(jobs_count, seed))
+    timings = []
+    for i in range(repeats):
+        instance = make_instance(jobs_count, seed + i)
+        start = time.perf_counter()
+        solve(instance)
+        timings.append(time.perf_counter() - start)
+    # Peak memory is measured in a separate run, tracemalloc slows the solver down
+    instance = make_instance(jobs_count, seed)
+    tracemalloc.start()
+    solve(instance)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    seconds = statistics.median(timings)
+    return {
+        'case': case,
+        'jobs_count': jobs_count,
+        'machines_count': instance.machines_count,
+        'seconds': seconds,
+        'min_seconds': min(timings),
+        'jobs_per_second': jobs_count / seconds if seconds > 0 else math.inf,
+        'peak_memory': peak_memory
+    }
+
+
+def scaling_exponent(results):
+    # Slope of log(time) over log(jobs): ~1 for linear paths, ~1.x for n log n, 2 for quadratic ones
+    points = [(math.log(i['jobs_count']), math.log(i['seconds'])) for i in results if i['seconds'] > 0]
+    if len(points) < 2:
+        return None
+    return float(np.polyfit([x for x, _ in points], [y for _, y in points], 1)[0])
+
+
+def run(cases=None, grid='default', repeats=5, seed=12345, log=None):
+    report = {'grid': grid, 'repeats': repeats, 'seed': seed, 'results': [], 'scaling': {}}
+    for case in cases or CASES:
+        case_results = []
+        for jobs_count in GRIDS[grid][case]:
+            result = measure(case, jobs_count, repeats, seed)
+            case_results.append(result)
+            if log:
+                log('%-27s n=%-8d %10.6f s %14.0f jobs/s %10.1f KiB' % (
+                    case, jobs_count, result['seconds'], result['jobs_per_second'], result['peak_memory'] / 1024))
+        report['results'] += case_results
+        report['scaling'][case] = scaling_exponent(case_results)
+    return report
+
+
+def compare(report, baseline, tolerance=0.25):
+    # Entries slower than the baseline by more than the tolerance share
+    baseline_results = {(i['case'], i['jobs_count']): i for i in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        previous = baseline_results.get((result['case'], result['jobs_count']))
+        if previous is None or previous['seconds'] <= 0:
+            continue
+        ratio = result['seconds'] / previous['seconds']
+        if ratio > 1 + tolerance:
+            regressions.append(dict(case=result['case'], jobs_count=result['jobs_count'], ratio=ratio,
+                                    seconds=result['seconds'], baseline_seconds=previous['seconds']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark of the Johnson solver paths')
+    parser.add_argument('--grid', default='default', choices=sorted(GRIDS))
+    parser.add_argument('--case', action='append', choices=sorted(CASES), help='run only these solver paths')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=12345)
+    parser.add_argument('--save-baseline', metavar='PATH', help='store the results as the baseline file')
+    parser.add_argument('--compare', metavar='PATH', help='compare the results with a baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown share against the baseline')
+    args = parser.parse_args(argv)
+
+    report = run(args.case, args.grid, args.repeats, args.seed, log=print)
+    for case, exponent in report['scaling'].items():
+        print('%-27s scaling exponent %s' % (case, 'n/a' if exponent is None else '%.2f' % exponent))
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        for i in regressions:
+            print('REGRESSION %-27s n=%-8d %.2fx slower (%.6f s against %.6f s)' % (
+                i['case'], i['jobs_count'], i['ratio'], i['seconds'], i['baseline_seconds']))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
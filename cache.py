@@ -0,0 +1,142 @@
+from collections import OrderedDict
+import hashlib
+import os
+import pickle
+import tempfile
+import numpy as np
+
+
+class SolutionCache:
+    def __init__(self, max_size=128, path=None):
+        if max_size < 1:
+            raise Exception('Cache size must be positive')
+        self.max_size = max_size
+        # Optional directory keeping one pickle per solution, shared between runs
+        self.path = path
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(processing, kind, alter_method=False, exact_method=None, method=None, improvement=None):
+        # Canonical content hash: float64 C-ordered bytes with -0.0 folded into 0.0, plus the shape
+        processing = np.ascontiguousarray(processing, dtype=float) + 0.0
+        machines_count = processing.shape[1] if processing.ndim == 2 else 0
+        if method is None:
+            method = 'johnson' if machines_count <= 3 else 'neh'
+        if machines_count != 3 or method != 'johnson':
+            # The alternative method and the exact search only exist for Johnson's method on 3 machines
+            alter_method = False
+            exact_method = None
+        digest = hashlib.sha256()
+        # improvement is the (method, iterations, seed) tuple of the improvement stage, None without it
+        digest.update(repr((kind, processing.shape, bool(alter_method), exact_method, method, improvement)).encode())
+        digest.update(processing.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        value = self.__load(key)
+        if value is not None:
+            self.disk_hits += 1
+            self.__remember(key, value)
+            return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.__remember(key, value)
+        self.__store(key, value)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def optimize(self, johnson, alter_method, exact_method='branch_and_bound', method=None, **exact_options):
+        improvement = None
+        if exact_options.get('improvement'):
+            improvement = (exact_options['improvement'], exact_options.get('iterations', 100), exact_options.get('seed', 0))
+        key = SolutionCache.key(johnson.instance.processing, 'optimize', alter_method, exact_method, method,
+                                improvement)
+        result = self.get(key)
+        if result is None:
+            result = dict(johnson.optimize(alter_method, exact_method, method=method, **exact_options))
+            # Items of the path belong to the caller's data, they are rebuilt from the sequence on every hit
+            del result['path']
+            # Statistics describe this solve only, a hit reports none
+            stats = result.pop('stats', None)
+            # An interrupted search is not a solution of the instance
+            if not result.get('stopped'):
+                self.put(key, result)
+            if stats is not None:
+                # The cached dict is kept as stored, the statistics go on a copy
+                result = dict(result)
+                result['stats'] = stats
+        else:
+            # The solver starts its incremental changes from the cached sequence
+            johnson.use_sequence(result['sequence'], alter_method, method)
+        result = dict(result)
+        result['path'] = johnson.path(result['sequence'])
+        return result
+
+    def get_original_params(self, johnson):
+        key = SolutionCache.key(johnson.instance.processing, 'original')
+        return self.get_or_compute(key, johnson.get_original_params)
+
+    def stats(self):
+        requests = self.hits + self.disk_hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_ratio': (self.hits + self.disk_hits) / requests if requests else 0.0,
+            'size': len(self.entries),
+            'max_size': self.max_size
+        }
+
+    def clear(self, disk=False):
+        self.entries.clear()
+        if disk and self.path is not None:
+            for name in os.listdir(self.path):
+                if name.endswith('.pickle'):
+                    os.remove(os.path.join(self.path, name))
+
+    def __remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def __file(self, key):
+        return os.path.join(self.path, key + '.pickle')
+
+    def __load(self, key):
+        if self.path is None:
+            return None
+        try:
+            with open(self.__file(key), 'rb') as file:
+                return pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def __store(self, key, value):
+        if self.path is None:
+            return
+        # Written to a temporary file first so that readers never see a partial pickle
+        handle, temp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.__file(key))
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
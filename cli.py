@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+import sys
+
+# Solver modules (and numpy with them) are imported inside the functions so that the
+# command starts without paying for them, and PyQt5/matplotlib are never imported at all
+
+# Same as Serializer.formats, kept here to avoid importing numpy while collecting files
+INSTANCE_EXTENSIONS = ('.json', '.npz', '.npy')
+
+
+def collect_paths(paths):
+    result = []
+    for path in paths:
+        if os.path.isdir(path):
+            result += sorted(os.path.join(path, i) for i in os.listdir(path) if i.lower().endswith(INSTANCE_EXTENSIONS))
+        else:
+            result.append(path)
+    return result
+
+
+def solve_file(path, alter_method=False, exact_method='branch_and_bound', cache_path=None, method=None,
+               improvement=None, iterations=100, seed=0, time_limit=None, node_limit=None, stats=False,
+               search_workers=None, prefix_depth=1, chunk_size=1):
+    import numpy as np
+    from cache import SolutionCache
+    from serializer import Serializer
+    from flowshop import FlowShopInstance
+    from johnson import Johnson
+    from instrumentation import Instrumentation
+
+    try:
+        data = Serializer.deserialize(path)
+        machines_count = int(data['machines_count_variants'][int(data['machines_count_selected_index'])])
+        details_count = int(data['details_count'])
+        # Slicing keeps memory-mapped binary instances mapped instead of copying them
+        queue = np.asarray(data['initial_queue'], dtype=float)[:machines_count, :details_count]
+        instance = FlowShopInstance.from_multiple_list(queue)
+        johnson = Johnson(instance)
+        instrumentation = Instrumentation() if stats else None
+        if cache_path is None:
+            opt = johnson.optimize(alter_method, exact_method, search_workers, prefix_depth, chunk_size, method=method,
+                                   improvement=improvement, iterations=iterations, seed=seed, time_limit=time_limit,
+                                   node_limit=node_limit, instrumentation=instrumentation)
+            orig_params = johnson.get_original_params()
+        else:
+            cache = SolutionCache(path=cache_path)
+            opt = cache.optimize(johnson, alter_method, exact_method, method, workers=search_workers,
+                                 prefix_depth=prefix_depth, chunk_size=chunk_size, improvement=improvement,
+                                 iterations=iterations, seed=seed, time_limit=time_limit, node_limit=node_limit,
+                                 instrumentation=instrumentation)
+            orig_params = cache.get_original_params(johnson)
+    except Exception as e:
+        return {'file': path, 'error': str(e)}
+    result = {'file': path}
+    result.update(summary(instance, opt, orig_params))
+    if stats:
+        result['stats'] = opt.get('stats')
+        if 'fronts' in opt:
+            result['fronts'] = opt['fronts']
+    return result
+
+
+def summary(instance, opt, orig_params):
+    # Plain JSON values of a solution and of the original order, shared with the service.
+    # Per machine totals come straight from the columnar timelines, no per task dicts are built
+    params = opt['params'].columns()
+    orig_params = orig_params.columns()
+    return {
+        'machines_count': instance.machines_count,
+        'details_count': instance.jobs_count,
+        'sequence': instance.names[opt['sequence']].tolist(),
+        'makespan': opt['makespan'],
+        'sum_delay': params['sum_delay'].tolist(),
+        'sum_working': params['sum_working'].tolist(),
+        'nodes': opt.get('nodes'),
+        'stopped': bool(opt.get('stopped')),
+        'lower_bound': opt['lower_bound'],
+        'gap': opt['gap'],
+        'optimal': bool(opt['optimal']),
+        'improvement': opt.get('improvement'),
+        'original': {
+            'makespan': float(orig_params['sum_working'][-1]),
+            'sum_delay': orig_params['sum_delay'].tolist(),
+            'sum_working': orig_params['sum_working'].tolist()
+        }
+    }
+
+
+def _solve_file(args):
+    return solve_file(*args)
+
+
+def solve_files(paths, alter_method=False, exact_method='branch_and_bound', workers=1, cache_path=None,
+                method=None, improvement=None, iterations=100, seed=0, time_limit=None, node_limit=None, stats=False,
+                search_workers=None, prefix_depth=1, chunk_size=1):
+    # workers solve files side by side, search_workers split the parallel exact search of every file
+    tasks = [(path, alter_method, exact_method, cache_path, method, improvement, iterations, seed, time_limit,
+              node_limit, stats, search_workers, prefix_depth, chunk_size) for path in paths]
+    if workers == 1 or len(tasks) < 2:
+        for task in tasks:
+            yield _solve_file(task)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(workers) as executor:
+        for result in executor.map(_solve_file, tasks):
+            yield result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Johnson flow shop optimizer without the GUI. '
+                                                 'Prints one JSON line per instance file.')
+    parser.add_argument('paths', nargs='+', help='instance files or directories with *.json, *.npz or *.npy instances')
+    parser.add_argument('-o', '--output', help='write JSON lines to the file instead of stdout')
+    parser.add_argument('-a', '--alternative', action='store_true', help='alternative method for 3 machines')
+    parser.add_argument('-e', '--exact-method', default='branch_and_bound',
+                        choices=['branch_and_bound', 'parallel_branch_and_bound', 'dynamic_programming', 'brute_force',
+                                 'none'],
+                        help="exact method used when Johnson conditions are not met, 'none' keeps the rule's order")
+    parser.add_argument('-m', '--method', choices=['johnson', 'neh', 'cds'],
+                        help="Johnson's method for 2 and 3 machines, NEH or CDS heuristic for any machines count "
+                             "(default: Johnson's method up to 3 machines, NEH for more)")
+    parser.add_argument('-i', '--improvement', choices=['local_search', 'iterated_greedy'],
+                        help='improvement stage for sequences not proven optimal')
+    parser.add_argument('--iterations', type=int, default=100, help='iterations of the iterated greedy')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of the improvement stage')
+    parser.add_argument('-t', '--time-limit', type=float,
+                        help='seconds per instance, the best sequence found is printed with its optimality gap')
+    parser.add_argument('--node-limit', type=int, help='nodes of the exact search per instance')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='processes solving instance files in parallel, 0 for all cores')
+    parser.add_argument('--search-workers', type=int, default=0,
+                        help='processes of the parallel branch and bound per instance, 0 for all cores')
+    parser.add_argument('--prefix-depth', type=int, default=1,
+                        help='length of the prefixes the parallel branch and bound splits the search tree by')
+    parser.add_argument('--chunk-size', type=int, default=1,
+                        help='prefixes sent to a process of the parallel branch and bound at once')
+    parser.add_argument('-c', '--cache-dir', help='directory keeping solutions between runs')
+    parser.add_argument('-s', '--stats', action='store_true',
+                        help='add stage timers and counters of every solve to its line (none on cache hits)')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='write the cProfile statistics of the run to the file, solves in a single process')
+    args = parser.parse_args(argv)
+
+    paths = collect_paths(args.paths)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    search_workers = args.search_workers if args.search_workers > 0 else None
+    exact_method = None if args.exact_method == 'none' else args.exact_method
+    if args.profile:
+        # Child processes would escape the profiler
+        workers = 1
+        search_workers = 1
+    output = open(args.output, 'w') if args.output else sys.stdout
+    failed = False
+    try:
+        with profile_to(args.profile):
+            for result in solve_files(paths, args.alternative, exact_method, workers, args.cache_dir,
+                                      args.method, args.improvement, args.iterations, args.seed, args.time_limit,
+                                      args.node_limit, args.stats, search_workers, args.prefix_depth,
+                                      args.chunk_size):
+                failed = failed or 'error' in result
+                output.write(json.dumps(result) + '\n')
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if failed else 0
+
+
+def profile_to(path):
+    if path is None:
+        from contextlib import nullcontext
+        return nullcontext()
+    from instrumentation import profile
+    return profile(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,659 @@
+from concurrent.futures import ProcessPoolExecutor, wait
+import multiprocessing
+import numpy as np
+import schedule
+import math
+import time
+
+
+class BranchAndBound:
+    def __init__(self, processing, memory_limit=1000000, shared_bound=None, progress=None, stop=None,
+                 progress_interval=1000, time_limit=None, node_limit=None, dominance=True, deadline=None):
+        # The time budget covers the setup below as well
+        if deadline is None and time_limit is not None:
+            deadline = time.perf_counter() + time_limit
+        self.processing = np.asarray(processing, dtype=float)
+        if self.processing.ndim != 2 or self.processing.shape[0] == 0:
+            raise Exception('Processing times must be a non-empty 2D matrix')
+        self.jobs_count, self.machines_count = self.processing.shape
+        # Work left on the machines after k for every job
+        self.tails = np.cumsum(self.processing[:, ::-1], axis=1)[:, ::-1] - self.processing
+        # Lageweg two-machine relaxations: machines k and l with the ones between them turned into
+        # job lags. Johnson's order on (a + lag, lag + b) solves every relaxation, and its restriction
+        # to any subset of jobs stays optimal, so the ranks are computed once
+        self.pairs = []
+        for k in range(self.machines_count - 1):
+            for l in range(k + 1, self.machines_count):
+                lags = self.processing[:, k + 1:l].sum(axis=1)
+                order = schedule.johnson_order(self.processing[:, k] + lags, lags + self.processing[:, l])
+                ranks = np.empty(self.jobs_count, dtype=int)
+                ranks[order] = np.arange(self.jobs_count)
+                self.pairs.append((k, l, ranks, lags))
+        # Identical jobs are interchangeable, only the first unscheduled job of every type is branched on
+        self.types = np.unique(self.processing, axis=0, return_inverse=True)[1].reshape(-1)
+        self.duplicates = dominance and len(np.unique(self.types)) < self.jobs_count
+        # Bitmasks of the jobs never branched on right after every job (see pair_dominance), also used by
+        # the dominance memory. They are computed for the last jobs of the prefixes met and kept, a dense
+        # table for every pair of jobs would cost more than the search on large instances
+        self.forbidden = {} if dominance else None
+        # Completion vectors of explored prefixes keyed by the bitmask of their jobs
+        self.memory_limit = memory_limit
+        self.explored = {}
+        self.explored_count = 0
+        # Incumbent makespan shared between processes searching the same instance
+        self.shared_bound = shared_bound
+        # Every progress_interval nodes progress(nodes, best_makespan) is called and stop() is asked
+        # whether the search has to be interrupted, keeping the best sequence found so far
+        self.progress = progress
+        self.stop = stop
+        self.progress_interval = progress_interval
+        # Budget: seconds since the solver was created (or a time.perf_counter() deadline given by the caller)
+        # and explored nodes of a solve, the best sequence is kept when it runs out
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.deadline = deadline
+        self.stopped = False
+        self.nodes = 0
+        # Complete sequences reached and prefixes cut by the dominance memory
+        self.leaves = 0
+        self.dominated = 0
+        self.best_makespan = math.inf
+        self.best_sequence = None
+        # Least bound of the subtrees left unexplored by an interrupted search
+        self.open_bound = math.inf
+        self.root_bound = None
+
+    def solve(self, initial_sequences=()):
+        self.reset(initial_sequences)
+        self.search(())
+        return self.result()
+
+    def reset(self, initial_sequences=()):
+        self.explored = {}
+        self.explored_count = 0
+        self.stopped = False
+        self.nodes = 0
+        self.leaves = 0
+        self.dominated = 0
+        self.best_makespan = math.inf
+        self.best_sequence = None
+        self.open_bound = math.inf
+        # Initial upper bound: the best of the given complete sequences (Johnson orders by default)
+        for sequence in (initial_sequences or BranchAndBound.johnson_sequences(self.processing)):
+            self.__offer(np.asarray(sequence, dtype=int))
+
+    def search(self, prefix, bound=0.0):
+        # Explores every sequence starting with the prefix against the current incumbent,
+        # bound is a known lower bound of those sequences
+        prefix = [int(i) for i in prefix]
+        scheduled = set(prefix)
+        unscheduled = np.array([i for i in range(self.jobs_count) if i not in scheduled], dtype=int)
+        completion = np.zeros(self.machines_count)
+        if prefix:
+            completion = schedule.completion_times(self.processing[prefix])[-1]
+        nodes = self.nodes
+        self.__branch(completion, prefix, unscheduled, sum(1 << i for i in prefix), bound)
+        return self.nodes - nodes
+
+    def result(self):
+        lower_bound = self.proven_bound(self.open_bound)
+        return {
+            'sequence': np.array(self.best_sequence, dtype=int),
+            'makespan': self.best_makespan,
+            'nodes': self.nodes,
+            'leaves': self.leaves,
+            'dominated': self.dominated,
+            'stopped': self.stopped,
+            'lower_bound': lower_bound,
+            'gap': BranchAndBound.gap(self.best_makespan, lower_bound),
+            'optimal': lower_bound >= self.best_makespan
+        }
+
+    def lower_bound(self):
+        # Bound of the whole problem: the least bound over the possible first jobs
+        if self.root_bound is None:
+            self.root_bound = float(self.__children(np.zeros(self.machines_count), np.arange(self.jobs_count))[1].min())
+        return self.root_bound
+
+    def proven_bound(self, open_bound):
+        # Every explored subtree is no better than the incumbent, the open ones no better than their bounds
+        return max(self.lower_bound(), min(self.best_makespan, open_bound))
+
+    @staticmethod
+    def gap(makespan, lower_bound):
+        # Relative distance between a sequence and the proven lower bound
+        return (makespan - lower_bound) / makespan if makespan > 0 else 0.0
+
+    def prefixes(self, depth):
+        # Prefixes of the given length not pruned by the incumbent, the most promising first
+        return [prefix for _, prefix in self.bounded_prefixes(depth)]
+
+    def bounded_prefixes(self, depth):
+        # (bound, prefix) pairs of prefixes()
+        found = []
+        self.__expand(np.zeros(self.machines_count), [], np.arange(self.jobs_count), depth, found)
+        found.sort(key=lambda x: x[0])
+        return found
+
+    def __expand(self, completion, prefix, unscheduled, depth, found):
+        child_completion, bounds = self.__children(completion, unscheduled)
+        eligible = self.__eligible(prefix, unscheduled)
+        for i in range(len(unscheduled)):
+            if bounds[i] >= self.best_makespan or not eligible[i]:
+                continue
+            child_prefix = prefix + [int(unscheduled[i])]
+            if depth == 1:
+                found.append((float(bounds[i]), child_prefix))
+            else:
+                self.__expand(child_completion[i], child_prefix, np.delete(unscheduled, i), depth - 1, found)
+
+    @staticmethod
+    def pair_dominance(processing, columns=None):
+        # Adjacent jobs act on the completion vector as a max-plus matrix product: P_ij[k][l] is the longest
+        # path from machine k to machine l through i and then j. When P_ij <= P_ji elementwise, swapping
+        # j, i into i, j delays no machine for any prefix. The relation is kept only for pairs going in
+        # the order of Johnson's rule on surrogate sums, which rules out cycles: swapping every adjacent
+        # dominated pair of an optimal sequence keeps it optimal and ends because each swap removes an
+        # inversion of that order, so an optimal sequence avoiding all such pairs exists.
+        # Result [i, c]: job i never goes right after job columns[c], all the jobs by default
+        processing = np.asarray(processing, dtype=float)
+        count, machines_count = processing.shape
+        columns = np.arange(count) if columns is None else np.asarray(columns, dtype=int)
+        sums = np.zeros((count, machines_count + 1))
+        sums[:, 1:] = np.cumsum(processing, axis=1)
+        dominates = np.ones((count, len(columns)), dtype=bool)
+        for k in range(machines_count):
+            for l in range(k, machines_count):
+                forward = np.full((count, len(columns)), -math.inf)
+                backward = np.full((count, len(columns)), -math.inf)
+                for t in range(k, l + 1):
+                    # i works on machines k..t, then j on machines t..l, and the other way round
+                    forward = np.maximum(forward, (sums[:, t + 1] - sums[:, k])[:, None] +
+                                         (sums[columns, l + 1] - sums[columns, t])[None, :])
+                    backward = np.maximum(backward, (sums[columns, t + 1] - sums[columns, k])[None, :] +
+                                          (sums[:, l + 1] - sums[:, t])[:, None])
+                dominates &= forward <= backward
+        positions = np.empty(count, dtype=int)
+        positions[schedule.johnson_order(processing[:, :-1].sum(axis=1), processing[:, 1:].sum(axis=1))] = \
+            np.arange(count)
+        return dominates & (positions[:, None] < positions[columns][None, :])
+
+    def __forbidden(self, last):
+        if last not in self.forbidden:
+            column = BranchAndBound.pair_dominance(self.processing, [last])[:, 0]
+            self.forbidden[last] = int.from_bytes(np.packbits(column, bitorder='little').tobytes(), 'little')
+        return self.forbidden[last]
+
+    def __eligible(self, prefix, unscheduled):
+        # Children left after collapsing identical jobs and skipping dominated pairs
+        eligible = np.ones(len(unscheduled), dtype=bool)
+        if self.duplicates:
+            eligible[:] = False
+            eligible[np.unique(self.types[unscheduled], return_index=True)[1]] = True
+        if self.forbidden is not None and prefix:
+            forbidden = self.__forbidden(prefix[-1]).to_bytes((self.jobs_count + 7) // 8, 'little')
+            precedes = np.unpackbits(np.frombuffer(forbidden, dtype=np.uint8), bitorder='little')
+            eligible &= precedes[unscheduled] == 0
+        return eligible
+
+    @staticmethod
+    def johnson_sequences(processing):
+        # Orders given by 2-machine Johnson's rule on surrogate (head, tail) sums of every machine split
+        processing = np.asarray(processing, dtype=float)
+        sequences = []
+        for k in range(1, processing.shape[1]):
+            sequences.append(schedule.johnson_order(processing[:, :k].sum(axis=1), processing[:, k:].sum(axis=1)))
+        if processing.shape[1] > 2:
+            sequences.append(schedule.johnson_order(processing[:, :-1].sum(axis=1), processing[:, 1:].sum(axis=1)))
+        return sequences
+
+    def __offer(self, sequence):
+        value = schedule.makespan(self.processing[sequence])
+        if value < self.best_makespan:
+            self.__improve(value, [int(i) for i in sequence])
+
+    def __improve(self, value, sequence):
+        self.best_makespan = value
+        self.best_sequence = sequence
+        if self.shared_bound is not None:
+            with self.shared_bound.get_lock():
+                if value < self.shared_bound.value:
+                    self.shared_bound.value = value
+
+    def __children(self, completion, unscheduled):
+        # Prefix completion times and Ignall-Schrage machine bounds of every child in one vectorized pass
+        times = self.processing[unscheduled]
+        count = len(unscheduled)
+        child_completion = np.empty((count, self.machines_count))
+        child_completion[:, 0] = completion[0] + times[:, 0]
+        for k in range(1, self.machines_count):
+            child_completion[:, k] = np.maximum(child_completion[:, k - 1], completion[k]) + times[:, k]
+        if count == 1:
+            return child_completion, child_completion[:, -1].copy()
+        remaining_work = times.sum(axis=0) - times
+        min_times = BranchAndBound.__min_excluding_self(times)
+        min_tails = BranchAndBound.__min_excluding_self(self.tails[unscheduled])
+        ready = np.empty((count, self.machines_count))
+        ready[:, 0] = child_completion[:, 0]
+        for k in range(1, self.machines_count):
+            ready[:, k] = np.maximum(child_completion[:, k], ready[:, k - 1] + min_times[:, k - 1])
+        bounds = (ready + remaining_work + min_tails).max(axis=1)
+        for k, l, ranks, lags in self.pairs:
+            bounds = np.maximum(bounds, self.__pair_bounds(times, unscheduled, ready, min_tails, k, l, ranks, lags))
+        return child_completion, bounds
+
+    @staticmethod
+    def __pair_bounds(times, unscheduled, ready, min_tails, k, l, ranks, lags):
+        # Optimal makespan of the (k, l) relaxation over the jobs left after every child.
+        # With jobs in Johnson order the last completion on l is
+        # sum(b) + max(ready_l, ready_k + max_i(A[i] + lag[i] - B[i-1])), A and B being prefix sums;
+        # dropping job j shifts the terms after it by b_j - a_j
+        order = np.argsort(ranks[unscheduled], kind='stable')
+        first = times[order, k]
+        second = times[order, l]
+        terms = np.cumsum(first) + lags[unscheduled[order]] - np.cumsum(second) + second
+        before = np.full(len(order), -math.inf)
+        before[1:] = np.maximum.accumulate(terms[:-1])
+        after = np.full(len(order), -math.inf)
+        after[:-1] = np.maximum.accumulate(terms[:0:-1])[::-1]
+        best_terms = np.maximum(before, after - first + second)
+        bounds = np.empty(len(order))
+        bounds[order] = (second.sum() - second + np.maximum(ready[order, l], ready[order, k] + best_terms) +
+                         min_tails[order, l])
+        return bounds
+
+    @staticmethod
+    def __min_excluding_self(values):
+        # For every row the column minimum over all the other rows
+        order = np.argsort(values, axis=0, kind='stable')
+        columns = np.arange(values.shape[1])
+        first = values[order[0], columns]
+        second = values[order[1], columns]
+        result = np.broadcast_to(first, values.shape).copy()
+        result[order[0], columns] = second
+        return result
+
+    def __dominated(self, mask, completion, last):
+        # A prefix is dominated by an explored one with the same jobs that frees every machine
+        # no later: each completion of it is at least as long as one already searched.
+        # With pair dominance the explored prefix must also allow every job allowed after this one
+        key = tuple(completion[1:].tolist())
+        front = self.explored.get(mask)
+        if front is not None:
+            for other, other_last in front:
+                if all(o <= c for o, c in zip(other, key)) and self.__covers(other_last, last, mask):
+                    return True
+        if self.explored_count < self.memory_limit:
+            if front is None:
+                self.explored[mask] = [(key, last)]
+            else:
+                front[:] = [(other, other_last) for other, other_last in front
+                            if not (all(c <= o for o, c in zip(other, key)) and
+                                    self.__covers(last, other_last, mask))]
+                front.append((key, last))
+            self.explored_count += 1
+        return False
+
+    def __covers(self, last, other_last, mask):
+        # Every unscheduled job allowed after other_last is allowed after last
+        if self.forbidden is None or last == other_last:
+            return True
+        return not self.__forbidden(last) & ~self.__forbidden(other_last) & ~mask
+
+    def __branch(self, completion, prefix, unscheduled, mask, bound):
+        if prefix and self.__dominated(mask, completion, prefix[-1]):
+            self.dominated += 1
+            return
+        self.nodes += 1
+        if self.nodes % self.progress_interval == 0:
+            self.__report()
+        if (self.node_limit is not None and self.nodes > self.node_limit or
+                self.deadline is not None and time.perf_counter() >= self.deadline):
+            self.stopped = True
+        if self.stopped:
+            self.open_bound = min(self.open_bound, bound)
+            return
+        if self.shared_bound is not None and self.shared_bound.value < self.best_makespan:
+            self.best_makespan = self.shared_bound.value
+        child_completion, bounds = self.__children(completion, unscheduled)
+        if len(unscheduled) == 1:
+            self.leaves += 1
+            if bounds[0] < self.best_makespan:
+                self.__improve(float(bounds[0]), prefix + [int(unscheduled[0])])
+            return
+        eligible = self.__eligible(prefix, unscheduled)
+        for i in np.argsort(bounds, kind='stable'):
+            if bounds[i] >= self.best_makespan:
+                break
+            if not eligible[i]:
+                continue
+            if self.stopped:
+                # Children go by increasing bound, the first one left bounds all the others
+                self.open_bound = min(self.open_bound, float(bounds[i]))
+                break
+            prefix.append(int(unscheduled[i]))
+            self.__branch(child_completion[i], prefix, np.delete(unscheduled, i), mask | 1 << int(unscheduled[i]),
+                          float(bounds[i]))
+            prefix.pop()
+
+    def __report(self):
+        if self.progress is not None:
+            self.progress(self.nodes, self.best_makespan)
+        if self.stop is not None and self.stop():
+            self.stopped = True
+
+
+class SubsetDynamicProgramming:
+    # Exact F3||Cmax over subsets of jobs instead of orders: a state is a set of scheduled jobs with the
+    # completion times of its last job on machines 2 and 3 (machine 1 never waits, its time is the work
+    # of the set). Only the states of a set not dominated on both times are kept, its Pareto front.
+    # Sets grow by one job per layer, every layer is a handful of array passes. 2 machines are solved
+    # as 3 with an empty last machine
+    def __init__(self, processing, memory_limit=256 * 2 ** 20, progress=None, stop=None, time_limit=None,
+                 node_limit=None, deadline=None):
+        if deadline is None and time_limit is not None:
+            deadline = time.perf_counter() + time_limit
+        self.processing = np.asarray(processing, dtype=float)
+        if self.processing.ndim != 2 or self.processing.shape[0] == 0:
+            raise Exception('Processing times must be a non-empty 2D matrix')
+        self.jobs_count, self.machines_count = self.processing.shape
+        if self.machines_count not in (2, 3):
+            raise Exception('Undefined units count')
+        # Subsets are int64 bitmasks
+        if self.jobs_count > 62:
+            raise Exception('Too many jobs for the subset dynamic programming')
+        self.times = np.zeros((self.jobs_count, 3))
+        self.times[:, :self.machines_count] = self.processing
+        # Bytes of the stored back pointers and of the working arrays of a layer, the search stops
+        # with the best sequence known before it would need more
+        self.memory_limit = memory_limit
+        self.progress = progress
+        self.stop = stop
+        # node_limit counts the states generated. Once a whole layer would go beyond it, only the states
+        # of the lowest bounds are expanded, the budget left being shared by the layers left, and the search
+        # ends as a beam on a complete sequence; at least one state a layer is kept, so limits below
+        # n * (n + 1) / 2 can be exceeded
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.deadline = deadline
+
+    def solve(self, initial_sequences=()):
+        deadline = self.deadline
+        times = self.times
+        totals = times.sum(axis=0)
+        best_sequence = min((np.asarray(i, dtype=int) for i in
+                             (initial_sequences or BranchAndBound.johnson_sequences(self.processing))),
+                            key=lambda x: schedule.makespan(self.processing[x]))
+        best_makespan = schedule.makespan(self.processing[best_sequence])
+        # State arrays of the current layer: job set, completion on machines 1-3, work of the set on 2 and 3
+        masks = np.zeros(1, dtype=np.int64)
+        c1, c2, c3, s2, s3 = (np.zeros(1) for _ in range(5))
+        # Back pointers of every layer: state of the previous layer and the job appended
+        parents, jobs = [], []
+        stored = 0
+        nodes = dominated = pruned = 0
+        subsets, states, max_front = [], [], 0
+        stopped = False
+        # Least bound of the states dropped by the beam
+        beam = False
+        open_bound = math.inf
+        for depth in range(self.jobs_count):
+            left = self.jobs_count - depth
+            if self.node_limit is not None and nodes + len(masks) * left > self.node_limit:
+                beam = True
+                width = max(1, (self.node_limit - nodes) // (left * (left + 1) // 2))
+                if width < len(masks):
+                    bounds = np.maximum(c3 + totals[2] - s3, c2 + totals[1] - s2 + times[:, 2].min())
+                    order = np.argsort(bounds, kind='stable')
+                    open_bound = min(open_bound, float(bounds[order[width]]))
+                    order = np.sort(order[:width])
+                    masks = masks[order]
+                    c1, c2, c3, s2, s3 = (i[order] for i in (c1, c2, c3, s2, s3))
+                    parents[-1] = parents[-1][order]
+                    jobs[-1] = jobs[-1][order]
+            candidates = len(masks) * left
+            # 12 arrays of 8 bytes per candidate at most are alive during the layer
+            if (stored + 96 * candidates > self.memory_limit or
+                    deadline is not None and time.perf_counter() >= deadline or
+                    self.stop is not None and self.stop()):
+                stopped = True
+                break
+            parts = []
+            for j in range(self.jobs_count):
+                index = np.flatnonzero((masks >> j) & 1 == 0)
+                if len(index):
+                    parts.append((index, j))
+            index = np.concatenate([i for i, _ in parts])
+            job = np.concatenate([np.full(len(i), j, dtype=np.int8) for i, j in parts])
+            nodes += len(index)
+            new_c1 = c1[index] + times[job, 0]
+            new_c2 = np.maximum(c2[index], new_c1) + times[job, 1]
+            new_c3 = np.maximum(c3[index], new_c2) + times[job, 2]
+            new_s2 = s2[index] + times[job, 1]
+            new_s3 = s3[index] + times[job, 2]
+            # Machine bounds of the completions, states that can not beat the incumbent are dropped
+            bounds = new_c3 + totals[2] - new_s3
+            if depth + 1 < self.jobs_count:
+                bounds = np.maximum(bounds, new_c2 + totals[1] - new_s2 + times[:, 2].min())
+            keep = bounds < best_makespan
+            pruned += len(index) - int(np.count_nonzero(keep))
+            index, job = index[keep], job[keep]
+            new_masks = masks[index] | np.left_shift(np.int64(1), job.astype(np.int64))
+            new_c1, new_c2, new_c3, new_s2, new_s3 = (i[keep] for i in (new_c1, new_c2, new_c3, new_s2, new_s3))
+            # Pareto fronts: sorted by set, then machine 2, then machine 3 completion, a state is kept when
+            # its machine 3 completion is below all the earlier ones of its set. Ranks of the machine 3
+            # completions shifted down by the set number turn that into one running minimum
+            order = np.lexsort((new_c3, new_c2, new_masks))
+            sorted_masks = new_masks[order]
+            group = np.cumsum(np.concatenate(([True], sorted_masks[1:] != sorted_masks[:-1]))) - 1
+            ranks = np.unique(new_c3[order], return_inverse=True)[1].reshape(-1).astype(np.int64)
+            values = ranks - group * (int(ranks.max(initial=0)) + 1)
+            running = np.minimum.accumulate(values)
+            front = np.concatenate(([True], values[1:] < running[:-1])) if len(values) else np.zeros(0, dtype=bool)
+            dominated += len(front) - int(np.count_nonzero(front))
+            order = order[front]
+            masks = new_masks[order]
+            c1, c2, c3, s2, s3 = (i[order] for i in (new_c1, new_c2, new_c3, new_s2, new_s3))
+            parents.append(index[order].astype(np.int32))
+            jobs.append(job[order])
+            stored += 5 * len(order)
+            sizes = np.bincount(group[front]) if len(order) else np.zeros(0, dtype=int)
+            subsets.append(len(sizes))
+            states.append(len(order))
+            max_front = max(max_front, int(sizes.max(initial=0)))
+            if self.progress is not None:
+                self.progress(nodes, best_makespan)
+            if len(masks) == 0:
+                # Every state is bounded out, nothing beats the incumbent
+                break
+
+        if stopped:
+            # The optimum extends one of the states left or dropped, or is no better than the incumbent
+            open_bound = min(open_bound, float((c3 + totals[2] - s3).min(initial=math.inf)))
+            lower_bound = max(BranchAndBound(self.processing).lower_bound(), min(best_makespan, open_bound))
+        else:
+            if len(masks):
+                state = int(np.argmin(c3))
+                if c3[state] < best_makespan:
+                    best_makespan = float(c3[state])
+                    sequence = []
+                    for depth in range(self.jobs_count - 1, -1, -1):
+                        sequence.append(int(jobs[depth][state]))
+                        state = int(parents[depth][state])
+                    best_sequence = np.array(sequence[::-1], dtype=int)
+            lower_bound = best_makespan
+            if beam:
+                lower_bound = max(BranchAndBound(self.processing).lower_bound(), min(best_makespan, open_bound))
+        stopped = stopped or beam
+        return {
+            'sequence': np.asarray(best_sequence, dtype=int),
+            'makespan': best_makespan,
+            'nodes': nodes,
+            'leaves': states[-1] if len(states) == self.jobs_count else 0,
+            'dominated': dominated,
+            'stopped': stopped,
+            'lower_bound': lower_bound,
+            'gap': BranchAndBound.gap(best_makespan, lower_bound),
+            'optimal': lower_bound >= best_makespan,
+            'fronts': {
+                'subsets': int(sum(subsets)),
+                'states': int(sum(states)),
+                'max_front': max_front,
+                'mean_front': sum(states) / sum(subsets) if sum(subsets) else 0.0,
+                'layer_states': states,
+                'pruned': pruned,
+                'memory': stored
+            }
+        }
+
+
+def multiset_permutations(labels):
+    # Distinct orders of a sequence with repeated labels in lexicographic order (next permutation steps)
+    items = sorted(labels)
+    count = len(items)
+    while True:
+        yield tuple(items)
+        i = count - 2
+        while i >= 0 and items[i] >= items[i + 1]:
+            i -= 1
+        if i < 0:
+            return
+        j = count - 1
+        while items[j] <= items[i]:
+            j -= 1
+        items[i], items[j] = items[j], items[i]
+        items[i + 1:] = reversed(items[i + 1:])
+
+
+class ParallelBranchAndBound:
+    def __init__(self, processing, workers=None, prefix_depth=1, chunk_size=1, memory_limit=1000000, progress=None,
+                 stop=None, poll_interval=0.2, time_limit=None, node_limit=None, deadline=None):
+        if deadline is None and time_limit is not None:
+            deadline = time.perf_counter() + time_limit
+        self.processing = np.asarray(processing, dtype=float)
+        if workers is not None and workers < 1:
+            raise Exception('Workers count must be positive')
+        if prefix_depth < 1 or chunk_size < 1:
+            raise Exception('Prefix depth and chunk size must be positive')
+        self.workers = workers
+        self.prefix_depth = prefix_depth
+        self.chunk_size = chunk_size
+        self.memory_limit = memory_limit
+        # progress and stop are served by the parent process every poll_interval seconds
+        self.progress = progress
+        self.stop = stop
+        self.poll_interval = poll_interval
+        # The node limit holds over all workers, they add their nodes to a shared counter on every report
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.deadline = deadline
+
+    def solve(self, initial_sequences=()):
+        # The search tree is split into subtrees under fixed prefixes, every worker process keeps its own
+        # dominance memory and all of them prune against the incumbent makespan kept in shared memory
+        root = BranchAndBound(self.processing, self.memory_limit, progress=self.progress, stop=self.stop,
+                              node_limit=self.node_limit, deadline=self.deadline)
+        root.reset(initial_sequences)
+        depth = min(self.prefix_depth, root.jobs_count - 1)
+        if depth < 1 or self.workers == 1:
+            root.search(())
+            return root.result()
+        prefixes = root.bounded_prefixes(depth)
+        chunks = [prefixes[i:i + self.chunk_size] for i in range(0, len(prefixes), self.chunk_size)]
+        context = multiprocessing.get_context()
+        shared_bound = context.Value('d', root.best_makespan)
+        stop_flag = context.Value('b', 0)
+        shared_nodes = context.Value('q', 0)
+        # Clocks of other processes are not comparable, workers get the seconds left instead of the deadline
+        remaining = None if root.deadline is None else max(0.0, root.deadline - time.perf_counter())
+        sequences = [root.best_sequence]
+        nodes = 0
+        leaves = 0
+        dominated = 0
+        stopped = False
+        open_bound = math.inf
+        with ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(self.processing, self.memory_limit, shared_bound, stop_flag, shared_nodes,
+                                           self.node_limit, remaining)) as executor:
+            pending = {executor.submit(_search_chunk, chunk): chunk for chunk in chunks}
+            while pending:
+                timeout = self.poll_interval
+                if root.deadline is not None:
+                    timeout = max(0.0, min(timeout, root.deadline - time.perf_counter()))
+                done = wait(pending, timeout=timeout)[0]
+                for future in done:
+                    chunk = pending.pop(future)
+                    if future.cancelled():
+                        open_bound = min([open_bound] + [bound for bound, _ in chunk])
+                        continue
+                    sequence, chunk_nodes, chunk_leaves, chunk_dominated, chunk_open_bound = future.result()
+                    nodes += chunk_nodes
+                    leaves += chunk_leaves
+                    dominated += chunk_dominated
+                    open_bound = min(open_bound, chunk_open_bound)
+                    if sequence is not None:
+                        sequences.append(sequence)
+                if self.progress is not None:
+                    self.progress(nodes, shared_bound.value)
+                out_of_budget = (self.node_limit is not None and max(nodes, shared_nodes.value) >= self.node_limit or
+                                 root.deadline is not None and time.perf_counter() >= root.deadline)
+                if not stopped and (out_of_budget or self.stop is not None and self.stop()):
+                    # Queued chunks are dropped, running ones notice the flag on their next report
+                    stopped = True
+                    stop_flag.value = 1
+                    for future in pending:
+                        future.cancel()
+        makespans = [schedule.makespan(self.processing[sequence]) for sequence in sequences]
+        best = int(np.argmin(makespans))
+        root.best_makespan = makespans[best]
+        lower_bound = root.proven_bound(open_bound)
+        return {
+            'sequence': np.array(sequences[best], dtype=int),
+            'makespan': makespans[best],
+            'nodes': nodes,
+            'leaves': leaves,
+            'dominated': dominated,
+            'stopped': stopped,
+            'lower_bound': lower_bound,
+            'gap': BranchAndBound.gap(makespans[best], lower_bound),
+            'optimal': lower_bound >= makespans[best]
+        }
+
+
+_worker = None
+
+
+_reported_nodes = 0
+
+
+def _init_worker(processing, memory_limit, shared_bound, stop_flag, shared_nodes, node_limit, time_limit):
+    global _worker
+    # Workers report more often than the default, stop() is served by the parent
+    _worker = BranchAndBound(processing, memory_limit, shared_bound, progress_interval=100, time_limit=time_limit,
+                             stop=lambda: _report_nodes(stop_flag, shared_nodes, node_limit))
+    _worker.best_makespan = shared_bound.value
+
+
+def _report_nodes(stop_flag, shared_nodes, node_limit):
+    global _reported_nodes
+    with shared_nodes.get_lock():
+        shared_nodes.value += _worker.nodes - _reported_nodes
+        total = shared_nodes.value
+    _reported_nodes = _worker.nodes
+    return stop_flag.value == 1 or node_limit is not None and total >= node_limit
+
+
+def _search_chunk(prefixes):
+    # (bound, prefix) pairs, the bounds of prefixes left unsearched after a stop go back with the result
+    _worker.best_sequence = None
+    _worker.open_bound = math.inf
+    nodes = 0
+    leaves = _worker.leaves
+    dominated = _worker.dominated
+    for bound, prefix in prefixes:
+        if _worker.stopped:
+            _worker.open_bound = min(_worker.open_bound, bound)
+            continue
+        nodes += _worker.search(prefix, bound)
+    return (_worker.best_sequence, nodes, _worker.leaves - leaves, _worker.dominated - dominated,
+            _worker.open_bound)
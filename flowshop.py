@@ -0,0 +1,124 @@
+from collections.abc import Sequence
+import numpy as np
+
+# Machines counts offered for an instance: Johnson's method covers 2 and 3, heuristics the rest
+MACHINES_COUNT_VARIANTS = [str(i) for i in range(2, 11)]
+
+
+class FlowShopInstance:
+    def __init__(self, processing, names=None):
+        # Processing times of every job (rows) on every machine (columns) in one contiguous block
+        self.processing = np.ascontiguousarray(processing, dtype=float)
+        if self.processing.ndim != 2:
+            raise Exception('Processing times must be a 2D matrix')
+        if names is None:
+            names = np.arange(1, self.jobs_count + 1)
+        self.names = np.asarray(names)
+        if len(self.names) != self.jobs_count:
+            raise Exception('Names count does not match jobs count')
+
+    @property
+    def jobs_count(self):
+        return self.processing.shape[0]
+
+    @property
+    def machines_count(self):
+        return self.processing.shape[1]
+
+    @staticmethod
+    def from_multiple_list(data_list):
+        # Machines by rows and details by columns, as in the 'initial_queue' table
+        data_list = np.asarray(data_list, dtype=float)
+        if data_list.size == 0:
+            raise Exception('Data list is empty')
+        return FlowShopInstance(data_list.T)
+
+    @staticmethod
+    def from_details(details):
+        if len(details) == 0:
+            return FlowShopInstance(np.empty((0, 0)), [])
+        machines_count = details[0].machines_count
+        if any(i.machines_count != machines_count for i in details):
+            raise Exception('Undefined units count')
+        processing = np.array([i.machines_processing for i in details], dtype=float)
+        return FlowShopInstance(processing, [i.name for i in details])
+
+    def insert_job(self, times, name=None):
+        # Appends a job, its index is returned; the processing array is reallocated
+        times = np.asarray(times, dtype=float).reshape(1, -1)
+        if times.shape[1] != self.machines_count:
+            raise Exception('Wrong machine processing time data')
+        if name is None:
+            name = self.names.max() + 1 if self.jobs_count else 1
+        self.processing = np.ascontiguousarray(np.vstack((self.processing, times)))
+        self.names = np.append(self.names, name)
+        return self.jobs_count - 1
+
+    def remove_job(self, index):
+        if index < 0 or index >= self.jobs_count:
+            raise Exception('No such index')
+        self.processing = np.ascontiguousarray(np.delete(self.processing, index, axis=0))
+        self.names = np.delete(self.names, index)
+
+    def update_job(self, index, times):
+        if index < 0 or index >= self.jobs_count:
+            raise Exception('No such index')
+        times = np.asarray(times, dtype=float)
+        if times.shape != (self.machines_count,):
+            raise Exception('Wrong machine processing time data')
+        # The processing array is reallocated as well, timelines and cached results keep the old times
+        processing = self.processing.copy()
+        processing[index] = times
+        self.processing = processing
+
+    def permute(self, sequence):
+        return self.processing[np.asarray(sequence, dtype=int)]
+
+    def detail(self, index):
+        return DetailItem(self.machines_count, self.processing[index], self.names[index].item())
+
+    def details(self, sequence=None):
+        if sequence is None:
+            sequence = range(self.jobs_count)
+        return [self.detail(i) for i in sequence]
+
+
+class DetailSequence(Sequence):
+    # Details of the instance in the order of the sequence, created one by one when they are read
+    def __init__(self, instance, sequence):
+        self.instance = instance
+        self.sequence = np.asarray(sequence, dtype=int)
+
+    @property
+    def processing(self):
+        return self.instance.permute(self.sequence)
+
+    @property
+    def names(self):
+        return self.instance.names[self.sequence]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return DetailSequence(self.instance, self.sequence[index])
+        return self.instance.detail(self.sequence[index])
+
+    def __len__(self):
+        return len(self.sequence)
+
+
+class DetailItem:
+    __slots__ = ('name', 'machines_count', 'machines_processing')
+
+    def __init__(self, machines_count, machines_processing, name=None):
+        # Processing times are either a list or a row view into FlowShopInstance.processing
+        self.name = name
+        self.machines_count = machines_count
+        if not isinstance(machines_processing, (list, np.ndarray)) or len(machines_processing) != machines_count:
+            raise Exception('Wrong machine processing time data')
+        self.machines_processing = machines_processing
+
+    @staticmethod
+    def create_from_multiple_list(data_list):
+        if len(data_list) == 0:
+            raise Exception('Data list is empty')
+        return FlowShopInstance.from_multiple_list(data_list).details()
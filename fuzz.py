@@ -0,0 +1,489 @@
+import argparse
+import copy
+import itertools
+import json
+import math
+import sys
+import time
+import numpy as np
+import batch
+import schedule
+from exact import BranchAndBound, ParallelBranchAndBound, SubsetDynamicProgramming
+from flowshop import FlowShopInstance
+from johnson import Johnson
+
+# Differential fuzzing of the solver and evaluator paths against ports of the original pure Python
+# implementations: bubble sorted Johnson's rules, the recursive __calc_up_downtime trace and the
+# __opt_cmb enumeration of every job order. Failing instances are shrunk to minimal reproducers.
+
+
+class Reference:
+    # Original algorithms on lists of per job machine times, kept as they were apart from the data layout
+
+    @staticmethod
+    def sort(arr, cmp):
+        while True:
+            swapped = False
+            for i in range(0, len(arr) - 1):
+                if cmp(arr[i], arr[i + 1]):
+                    arr[i], arr[i + 1] = arr[i + 1], arr[i]
+                    swapped = True
+            if not swapped:
+                break
+        return arr
+
+    @staticmethod
+    def optimize(processing, alter_method):
+        # Job indexes of the original Johnson.optimize for 2 and 3 machines
+        data = [(i, list(row)) for i, row in enumerate(np.asarray(processing, dtype=float).tolist())]
+        machines_count = len(data[0][1])
+        if machines_count == 2:
+            opt = Reference.sort(list(data), lambda a, b: min(a[1][0], b[1][1]) > min(a[1][1], b[1][0]))
+        elif machines_count == 3:
+            min_1st_machine = min(i[1][0] for i in data)
+            min_3rd_machine = min(i[1][2] for i in data)
+            max_2nd_machine = max(i[1][1] for i in data)
+            if not alter_method and min_1st_machine >= max_2nd_machine:
+                opt = Reference.sort(list(data), lambda a, b: min(a[1][0] + a[1][1], b[1][2]) >
+                                     min(a[1][2], b[1][0] + b[1][1]))
+            elif not alter_method and min_3rd_machine >= max_2nd_machine:
+                opt = Reference.sort(list(data), lambda a, b: min(a[1][0], b[1][1] + b[1][2]) >
+                                     min(a[1][1] + a[1][2], b[1][0]))
+            elif alter_method and (min_1st_machine >= max_2nd_machine or min_3rd_machine >= max_2nd_machine):
+                opt = Reference.sort(list(data), lambda a, b: min(a[1][0] + a[1][1], b[1][1] + b[1][2]) >
+                                     min(a[1][1] + a[1][2], b[1][0] + b[1][1]))
+            else:
+                return Reference.opt_cmb(processing)
+        else:
+            raise Exception('Undefined units count')
+        return [i[0] for i in opt]
+
+    @staticmethod
+    def calc_up_downtime(data, machine_count=None, prev_machine=0, tracing=None):
+        # data is a list of per job machine times in the order of the sequence
+        if machine_count is None:
+            data = [list(i) for i in data]
+            machine_count = len(data[0])
+        if machine_count == 0 or prev_machine + 1 == machine_count:
+            return tracing
+        if tracing is None:
+            start_work_times = [i[0] for i in data]
+            tasks = []
+            for i in range(len(data)):
+                prev_tasks_duration = sum([start_work_times[j] for j in range(len(start_work_times)) if j < i])
+                tasks.append({'delay': {'starts': prev_tasks_duration, 'duration': 0},
+                              'activity': {'starts': prev_tasks_duration, 'duration': start_work_times[i]}})
+            tracing = {'0': {'tasks': tasks, 'sum_delay': 0, 'sum_working': sum(start_work_times)}}
+        curr_machine = prev_machine + 1
+        delays = []
+        for i in range(len(data)):
+            delay = max(sum([data[x][prev_machine] for x in range(len(data)) if x <= i]) -
+                        sum([data[x][curr_machine] for x in range(len(data)) if x < i]) - sum(delays), 0)
+            delays.append(delay)
+        current_work_times = [data[i][curr_machine] for i in range(len(data))]
+        tasks = []
+        prev_detail_time_end = 0
+        for i in range(len(data)):
+            tasks.append(dict(delay=dict(starts=prev_detail_time_end, duration=delays[i]),
+                              activity=dict(starts=prev_detail_time_end + delays[i], duration=current_work_times[i])))
+            prev_detail_time_end += delays[i] + current_work_times[i]
+        tracing[str(curr_machine)] = {
+            'tasks': tasks, 'sum_delay': sum(delays), 'sum_working': sum(current_work_times) + sum(delays)
+        }
+        next_data = copy.deepcopy(data)
+        for i in range(len(data)):
+            next_data[i][curr_machine] += delays[i]
+        return Reference.calc_up_downtime(next_data, machine_count, prev_machine + 1, tracing)
+
+    @staticmethod
+    def makespan(rows):
+        tracing = Reference.calc_up_downtime(rows)
+        return max(tracing[i]['sum_working'] for i in tracing)
+
+    @staticmethod
+    def opt_cmb(processing):
+        # Every job order, the first one with the least makespan wins
+        rows = np.asarray(processing, dtype=float).tolist()
+        opt_path = dict(duration=math.inf, path=None)
+        for order in itertools.permutations(range(len(rows))):
+            duration = Reference.makespan([rows[i] for i in order])
+            if opt_path['duration'] > duration:
+                opt_path['duration'] = duration
+                opt_path['path'] = list(order)
+        return opt_path['path']
+
+
+def random_instance(rng, jobs_count, machines_count, kind):
+    if kind == 'uniform':
+        return rng.integers(1, 20, (jobs_count, machines_count)).astype(float)
+    elif kind == 'ties':
+        return rng.integers(0, 3, (jobs_count, machines_count)).astype(float)
+    elif kind == 'zeros':
+        return rng.integers(1, 10, (jobs_count, machines_count)) * (rng.random((jobs_count, machines_count)) < 0.4)
+    elif kind == 'identical':
+        rows = rng.integers(0, 10, (max(1, jobs_count // 2), machines_count)).astype(float)
+        return rows[rng.integers(len(rows), size=jobs_count)]
+    elif kind == 'dominant':
+        # One of Johnson's 3 machines conditions holds
+        processing = rng.integers(1, 20, (jobs_count, machines_count)).astype(float)
+        processing[:, 1] = rng.integers(0, 8, jobs_count)
+        processing[:, rng.choice([0, machines_count - 1])] = rng.integers(8, 20, jobs_count)
+        return processing
+    elif kind == 'dominant_ties':
+        # A condition holds on narrow times, the surrogate times of the rule often tie
+        processing = rng.integers(0, 5, (jobs_count, machines_count)).astype(float)
+        processing[:, 1] = rng.integers(0, 3, jobs_count)
+        dominant = rng.choice([0, machines_count - 1])
+        processing[:, dominant] = np.maximum(processing[:, dominant], processing[:, 1].max())
+        return processing
+    elif kind == 'fractional':
+        return np.round(rng.random((jobs_count, machines_count)) * 10, 2)
+    raise Exception('Undefined instance kind')
+
+
+INSTANCE_KINDS = ('uniform', 'ties', 'zeros', 'identical', 'dominant', 'dominant_ties', 'fractional')
+
+
+def close(a, b):
+    return bool(np.allclose(a, b, rtol=1e-9, atol=1e-9))
+
+
+def same_trace(trace, reference):
+    # Totals and every task of the timeline
+    for key in reference:
+        if not close(trace[key]['sum_delay'], reference[key]['sum_delay']) or \
+                not close(trace[key]['sum_working'], reference[key]['sum_working']):
+            return False
+        for task, reference_task in zip(trace[key]['tasks'], reference[key]['tasks']):
+            for part in ('delay', 'activity'):
+                if not close([task[part]['starts'], task[part]['duration']],
+                             [reference_task[part]['starts'], reference_task[part]['duration']]):
+                    return False
+    return len(trace) == len(reference)
+
+
+def reported_trace(processing, opt):
+    # The params of a result must be the timeline of its own sequence
+    reference = Reference.calc_up_downtime(processing[opt['sequence']].tolist())
+    return None if same_trace(opt['params'], reference) else 'params differ from the trace of the sequence'
+
+
+# Checks: instance -> None when the path agrees with the reference, a message otherwise.
+# Every check returns (message, seconds of the fast path, seconds of the reference)
+
+def check_optimize(processing, rng):
+    # The original bubble sort is no valid ordering and misses the optimum on some instances of 2 machines,
+    # so a result may be shorter than the original one, never longer, and exactly optimal when it claims so.
+    # The ordinary 3 machines rules keep the original order itself
+    if processing.shape[1] > 3:
+        return None, 0.0, 0.0
+    alter_method = bool(rng.integers(2))
+    exact_method = ('branch_and_bound', 'dynamic_programming', 'brute_force')[rng.integers(3)]
+    start = time.perf_counter()
+    opt = Johnson(FlowShopInstance(processing)).optimize(alter_method, exact_method)
+    fast = time.perf_counter() - start
+    start = time.perf_counter()
+    reference_sequence = Reference.optimize(processing, alter_method)
+    reference = Reference.makespan(processing[reference_sequence].tolist())
+    slow = time.perf_counter() - start
+    ordinary_rule = processing.shape[1] == 3 and not alter_method and \
+        max(processing[:, 0].min(), processing[:, 2].min()) >= processing[:, 1].max()
+    if ordinary_rule and opt['sequence'].tolist() != reference_sequence:
+        return 'sequence %s, original %s' % (opt['sequence'].tolist(), reference_sequence), fast, slow
+    message = compare_optimal(opt, reference, Reference.makespan(processing[Reference.opt_cmb(processing)].tolist()))
+    if message is not None:
+        return '%s (alter_method=%s, %s)' % (message, alter_method, exact_method), fast, slow
+    return reported_trace(processing, opt), fast, slow
+
+
+def compare_optimal(opt, reference, optimum):
+    if opt['makespan'] > reference + 1e-9:
+        return 'makespan %g, original %g' % (opt['makespan'], reference)
+    if opt['makespan'] < optimum - 1e-9 or opt['optimal'] and not close(opt['makespan'], optimum):
+        return 'makespan %g (optimal=%s), optimum %g' % (opt['makespan'], opt['optimal'], optimum)
+    return None
+
+
+def check_exact(processing, rng):
+    start = time.perf_counter()
+    result = BranchAndBound(processing).solve()
+    fast = time.perf_counter() - start
+    start = time.perf_counter()
+    reference = Reference.makespan(processing[Reference.opt_cmb(processing)].tolist())
+    slow = time.perf_counter() - start
+    makespan = Reference.makespan(processing[result['sequence']].tolist())
+    if not close(makespan, reference) or not close(result['makespan'], reference):
+        return 'makespan %g (reported %g), reference %g' % (makespan, result['makespan'], reference), fast, slow
+    return None, fast, slow
+
+
+def check_dynamic_programming(processing, rng):
+    if processing.shape[1] > 3:
+        return None, 0.0, 0.0
+    start = time.perf_counter()
+    result = SubsetDynamicProgramming(processing).solve()
+    fast = time.perf_counter() - start
+    start = time.perf_counter()
+    reference = Reference.makespan(processing[Reference.opt_cmb(processing)].tolist())
+    slow = time.perf_counter() - start
+    makespan = Reference.makespan(processing[result['sequence']].tolist())
+    if not close(makespan, reference) or not close(result['makespan'], reference) or not result['optimal']:
+        return 'makespan %g (reported %g), reference %g' % (makespan, result['makespan'], reference), fast, slow
+    return None, fast, slow
+
+
+def check_parallel_exact(processing, rng):
+    start = time.perf_counter()
+    result = ParallelBranchAndBound(processing, workers=2, prefix_depth=1).solve()
+    fast = time.perf_counter() - start
+    start = time.perf_counter()
+    reference = Reference.makespan(processing[Reference.opt_cmb(processing)].tolist())
+    slow = time.perf_counter() - start
+    if not close(result['makespan'], reference):
+        return 'makespan %g, reference %g' % (result['makespan'], reference), fast, slow
+    return None, fast, slow
+
+
+def check_heuristics(processing, rng):
+    # Not optimal, but never better than the optimum and always with a matching timeline
+    method = ('neh', 'cds')[rng.integers(2)]
+    improvement = (None, 'local_search', 'iterated_greedy')[rng.integers(3)]
+    start = time.perf_counter()
+    opt = Johnson(FlowShopInstance(processing)).optimize(False, method=method, improvement=improvement,
+                                                         iterations=10)
+    fast = time.perf_counter() - start
+    start = time.perf_counter()
+    reference = Reference.makespan(processing[Reference.opt_cmb(processing)].tolist())
+    slow = time.perf_counter() - start
+    if opt['makespan'] < reference - 1e-9 or opt['lower_bound'] > reference + 1e-9:
+        return 'makespan %g, bound %g, optimum %g (%s, %s)' % (opt['makespan'], opt['lower_bound'], reference,
+                                                               method, improvement), fast, slow
+    return reported_trace(processing, opt), fast, slow
+
+
+def check_trace(processing, rng):
+    sequence = rng.permutation(len(processing))
+    start = time.perf_counter()
+    trace = schedule.trace(processing[sequence])
+    tasks = trace.to_dict()
+    fast = time.perf_counter() - start
+    start = time.perf_counter()
+    reference = Reference.calc_up_downtime(processing[sequence].tolist())
+    slow = time.perf_counter() - start
+    if not same_trace(tasks, reference):
+        return 'trace differs', fast, slow
+    columns = trace.columns()
+    if not close(columns['sum_delay'], [reference[str(k)]['sum_delay'] for k in range(processing.shape[1])]):
+        return 'columnar sum_delay differs', fast, slow
+    return None, fast, slow
+
+
+def check_evaluate_permutations(processing, rng):
+    permutations = np.array([rng.permutation(len(processing)) for _ in range(8)])
+    start = time.perf_counter()
+    makespans, idle = schedule.evaluate_permutations(processing, permutations, memory_limit=256)
+    samples = schedule.evaluate_batch(processing[permutations])
+    fast = time.perf_counter() - start
+    start = time.perf_counter()
+    references = [Reference.calc_up_downtime(processing[i].tolist()) for i in permutations]
+    slow = time.perf_counter() - start
+    for i, reference in enumerate(references):
+        reference_idle = [reference[str(k)]['sum_delay'] for k in range(processing.shape[1])]
+        reference_makespan = reference[str(processing.shape[1] - 1)]['sum_working']
+        if not close(makespans[i], reference_makespan) or not close(samples[0][i], reference_makespan):
+            return 'makespan of order %s differs' % permutations[i].tolist(), fast, slow
+        # Idle of the first machine is zero in the reference, the evaluators count none either
+        if not close(idle[i], reference_idle) or not close(samples[1][i], reference_idle):
+            return 'idle totals of order %s differ' % permutations[i].tolist(), fast, slow
+    return None, fast, slow
+
+
+def check_insertion(processing, rng):
+    if len(processing) < 2:
+        return None, 0.0, 0.0
+    job = int(rng.integers(len(processing)))
+    rest = np.delete(np.arange(len(processing)), job)
+    start = time.perf_counter()
+    makespans = schedule.insertion_makespans(processing[rest], processing[job])
+    fast = time.perf_counter() - start
+    start = time.perf_counter()
+    references = [Reference.makespan(processing[np.insert(rest, i, job)].tolist()) for i in range(len(rest) + 1)]
+    slow = time.perf_counter() - start
+    if not close(makespans, references):
+        return 'insertion makespans %s, reference %s' % (makespans.tolist(), references), fast, slow
+    return None, fast, slow
+
+
+def check_incremental(processing, rng):
+    # An edit of a solved instance against the reference solve of the edited instance
+    if processing.shape[1] > 3 or len(processing) < 2:
+        return None, 0.0, 0.0
+    alter_method = bool(rng.integers(2))
+    johnson = Johnson(FlowShopInstance(processing[:-1].copy()))
+    johnson.optimize(alter_method)
+    start = time.perf_counter()
+    operation = rng.integers(3)
+    if operation == 0:
+        opt = johnson.insert(processing[-1])
+        edited = processing
+    elif operation == 1:
+        index = int(rng.integers(len(processing) - 1))
+        opt = johnson.update(index, processing[-1])
+        edited = processing[:-1].copy()
+        edited[index] = processing[-1]
+    else:
+        johnson.insert(processing[-1])
+        index = int(rng.integers(len(processing)))
+        opt = johnson.remove(index)
+        edited = np.delete(processing, index, axis=0)
+    fast = time.perf_counter() - start
+    start = time.perf_counter()
+    optimum = Reference.makespan(edited[Reference.opt_cmb(edited)].tolist())
+    slow = time.perf_counter() - start
+    if not close(johnson.instance.processing, edited):
+        return 'instance differs from the edited one', fast, slow
+    # A best insertion may be longer than the original solve, it only has to be honest about it
+    message = compare_optimal(opt, math.inf, optimum)
+    if message is not None:
+        return '%s, operation %d' % (message, operation), fast, slow
+    return reported_trace(edited, opt), fast, slow
+
+
+def check_batch(processing, rng):
+    # The instance and two of its variants solved together, padded to the longest one
+    if processing.shape[1] > 3:
+        return None, 0.0, 0.0
+    alter_method = bool(rng.integers(2))
+    instances = [processing, processing[:-1], processing[rng.permutation(len(processing))]]
+    start = time.perf_counter()
+    opt = batch.solve_batch(*batch.pad_instances(instances), alter_method=alter_method)
+    fast = time.perf_counter() - start
+    start = time.perf_counter()
+    references = []
+    for times in instances:
+        if len(times) == 0:
+            references.append((0.0, 0.0))
+        else:
+            references.append((Reference.makespan(times[Reference.optimize(times, alter_method)].tolist()),
+                               Reference.makespan(times[Reference.opt_cmb(times)].tolist())))
+    slow = time.perf_counter() - start
+    for b, (times, (reference, optimum)) in enumerate(zip(instances, references)):
+        sequence = opt['sequence'][b][:len(times)]
+        if sorted(sequence.tolist()) != list(range(len(times))) or np.any(opt['sequence'][b][len(times):] != -1):
+            return 'sequence %s of instance %d is no job order' % (opt['sequence'][b].tolist(), b), fast, slow
+        if not close(opt['makespan'][b], schedule.makespan(times[sequence])):
+            return 'reported makespan of instance %d differs' % b, fast, slow
+        message = compare_optimal({'makespan': opt['makespan'][b], 'optimal': opt['optimal'][b]}, reference, optimum)
+        if message is not None:
+            return '%s, instance %d (alter_method=%s)' % (message, b, alter_method), fast, slow
+    return None, fast, slow
+
+
+CHECKS = {
+    'optimize': check_optimize,
+    'branch_and_bound': check_exact,
+    'dynamic_programming': check_dynamic_programming,
+    'heuristics': check_heuristics,
+    'trace': check_trace,
+    'evaluate_permutations': check_evaluate_permutations,
+    'insertion_makespans': check_insertion,
+    'incremental': check_incremental,
+    'batch': check_batch,
+    # Starts worker processes for every instance, only run when asked for
+    'parallel_branch_and_bound': check_parallel_exact
+}
+
+DEFAULT_CHECKS = [i for i in CHECKS if i != 'parallel_branch_and_bound']
+
+
+def failing(check, processing, seed):
+    try:
+        return check(processing, np.random.default_rng(seed))[0]
+    except Exception as e:
+        return 'exception: %r' % e
+
+
+def shrink(check, processing, seed, budget=500):
+    # Greedy reduction keeping the failure: fewer jobs, fewer machines, zeros and smaller values
+    processing = np.array(processing, dtype=float)
+    message = failing(check, processing, seed)
+    while budget > 0:
+        candidates = [np.delete(processing, i, axis=0) for i in range(len(processing)) if len(processing) > 1]
+        candidates += [np.delete(processing, k, axis=1) for k in range(processing.shape[1])
+                       if processing.shape[1] > 2]
+        for j, k in zip(*np.nonzero(processing)):
+            for value in (0.0, math.floor(processing[j, k] / 2)):
+                if value != processing[j, k]:
+                    candidate = processing.copy()
+                    candidate[j, k] = value
+                    candidates.append(candidate)
+        for candidate in candidates:
+            budget -= 1
+            candidate_message = failing(check, candidate, seed)
+            if candidate_message is not None:
+                processing, message = candidate, candidate_message
+                break
+            if budget <= 0:
+                break
+        else:
+            break
+    return processing, message
+
+
+def run(cases=1000, seed=0, max_jobs=6, max_machines=4, checks=None, log=None):
+    # Every case draws an instance kind and size, then runs every check on it with its own seed
+    rng = np.random.default_rng(seed)
+    checks = checks or DEFAULT_CHECKS
+    paths = {i: {'checks': 0, 'failures': 0, 'seconds': 0.0, 'reference_seconds': 0.0} for i in checks}
+    failures = []
+    for case in range(cases):
+        kind = INSTANCE_KINDS[rng.integers(len(INSTANCE_KINDS))]
+        machines_count = int(rng.integers(2, max_machines + 1))
+        processing = random_instance(rng, int(rng.integers(1, max_jobs + 1)), machines_count, kind).astype(float)
+        for name in checks:
+            check_seed = int(rng.integers(2 ** 32))
+            try:
+                message, fast, slow = CHECKS[name](processing, np.random.default_rng(check_seed))
+            except Exception as e:
+                message, fast, slow = 'exception: %r' % e, 0.0, 0.0
+            paths[name]['checks'] += 1
+            paths[name]['seconds'] += fast
+            paths[name]['reference_seconds'] += slow
+            if message is not None:
+                paths[name]['failures'] += 1
+                minimal, minimal_message = shrink(CHECKS[name], processing, check_seed)
+                failures.append({'path': name, 'case': case, 'kind': kind, 'seed': check_seed,
+                                 'message': minimal_message, 'processing': minimal.tolist(),
+                                 'original_processing': processing.tolist()})
+                if log:
+                    log('FAIL %s case %d: %s %s' % (name, case, minimal_message, minimal.tolist()))
+    for path in paths.values():
+        path['speedup'] = path['reference_seconds'] / path['seconds'] if path['seconds'] > 0 else None
+    return {'cases': cases, 'seed': seed, 'paths': paths, 'failures': failures}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Differential fuzzing of the solver paths against the '
+                                                 'original reference implementations')
+    parser.add_argument('-n', '--cases', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-jobs', type=int, default=6, help='the reference enumerates every job order')
+    parser.add_argument('--max-machines', type=int, default=4)
+    parser.add_argument('--check', action='append', choices=sorted(CHECKS), help='run only these paths')
+    parser.add_argument('--output', help='write the JSON report with the minimal failing cases to the file')
+    args = parser.parse_args(argv)
+
+    log = lambda line: print(line, file=sys.stderr)
+    report = run(args.cases, args.seed, args.max_jobs, args.max_machines, args.check, log)
+    for name, path in report['paths'].items():
+        print('%-24s %6d checks %4d failures %10.4f s %10.4f s reference %8.1fx' % (
+            name, path['checks'], path['failures'], path['seconds'], path['reference_seconds'],
+            path['speedup'] or 0.0))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    return 1 if report['failures'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import numpy as np
+import schedule
+import time
+
+
+def cds_sequences(processing):
+    # Campbell, Dudek and Smith: Johnson's rule on m - 1 surrogate 2-machine problems,
+    # the k-th one sums the first k and the last k machines
+    processing = np.asarray(processing, dtype=float)
+    heads = np.cumsum(processing, axis=1)
+    tails = np.cumsum(processing[:, ::-1], axis=1)
+    return [schedule.johnson_order(heads[:, k], tails[:, k]) for k in range(processing.shape[1] - 1)]
+
+
+def cds(processing):
+    # The surrogate order with the least makespan, the first one on ties
+    processing = np.asarray(processing, dtype=float)
+    sequences = cds_sequences(processing)
+    makespans = [schedule.makespan(processing[i]) for i in sequences]
+    return sequences[int(np.argmin(makespans))]
+
+
+def neh(processing, order=None):
+    # Nawaz, Enscore and Ham: jobs by decreasing total time are inserted one by one at the position
+    # with the least partial makespan (the earliest one on ties)
+    processing = np.asarray(processing, dtype=float)
+    if processing.ndim != 2:
+        raise Exception('Processing times must be a 2D matrix')
+    if order is None:
+        order = np.argsort(-processing.sum(axis=1), kind='stable')
+    sequence = []
+    for job in order:
+        makespans = schedule.insertion_makespans(processing[sequence], processing[job])
+        sequence.insert(int(np.argmin(makespans)), int(job))
+    return np.array(sequence, dtype=int)
+
+
+def insertion_local_search(processing, sequence, rng=None):
+    # Every job is taken out and put back at its best position while that shortens the schedule.
+    # One move is evaluated for all positions at once by schedule.insertion_makespans
+    processing = np.asarray(processing, dtype=float)
+    sequence = [int(i) for i in sequence]
+    current = schedule.makespan(processing[sequence])
+    improved = True
+    while improved:
+        improved = False
+        for job in (sequence[:] if rng is None else rng.permutation(sequence).tolist()):
+            position = sequence.index(job)
+            rest = sequence[:position] + sequence[position + 1:]
+            makespans = schedule.insertion_makespans(processing[rest], processing[job])
+            best = int(np.argmin(makespans))
+            # The tolerance keeps rounding differences of float times from being taken for improvements
+            if makespans[best] < current - 1e-9 * max(1.0, current):
+                sequence = rest[:best] + [job] + rest[best:]
+                current = float(makespans[best])
+                improved = True
+    return np.array(sequence, dtype=int)
+
+
+def iterated_greedy(processing, sequence, iterations=100, destruction=4, temperature=0.4, seed=0, time_limit=None):
+    # Ruiz and Stutzle: remove a few random jobs, reinsert them greedily, improve by insertion search and
+    # accept a worse sequence with the probability of the simulated annealing constant temperature.
+    # Returns the best sequence and the number of iterations done before the time limit
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    processing = np.asarray(processing, dtype=float)
+    rng = np.random.default_rng(seed)
+    jobs_count, machines_count = processing.shape
+    temperature = temperature * processing.sum() / (jobs_count * machines_count * 10) if jobs_count else 0.0
+    current = insertion_local_search(processing, sequence, rng)
+    current_makespan = schedule.makespan(processing[current])
+    best, best_makespan = current, current_makespan
+    done = 0
+    for done in range(iterations if jobs_count > 1 else 0):
+        if deadline is not None and time.perf_counter() >= deadline:
+            return best, done
+        removed = rng.choice(jobs_count, min(destruction, jobs_count - 1), replace=False)
+        partial = np.delete(current, removed).tolist()
+        for job in current[removed]:
+            makespans = schedule.insertion_makespans(processing[partial], processing[job])
+            partial.insert(int(np.argmin(makespans)), int(job))
+        candidate = insertion_local_search(processing, partial, rng)
+        candidate_makespan = schedule.makespan(processing[candidate])
+        if candidate_makespan < current_makespan:
+            current, current_makespan = candidate, candidate_makespan
+            if candidate_makespan < best_makespan:
+                best, best_makespan = candidate, candidate_makespan
+        elif temperature > 0 and rng.random() <= np.exp(-(candidate_makespan - current_makespan) / temperature):
+            current, current_makespan = candidate, candidate_makespan
+    return best, iterations
@@ -0,0 +1,72 @@
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+import cProfile
+import pstats
+import time
+
+
+class Instrumentation:
+    # Opt-in stage timers and event counters of a solve.
+    # Callbacks are called as callback(kind, name, value) with kind 'stage' (value in seconds) or 'count'
+    def __init__(self, callbacks=()):
+        self.timers = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.callbacks = list(callbacks)
+
+    def add_callback(self, callback):
+        self.callbacks.append(callback)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timers[name] += elapsed
+            for callback in self.callbacks:
+                callback('stage', name, elapsed)
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+        for callback in self.callbacks:
+            callback('count', name, value)
+
+    def stats(self):
+        return {'timers': dict(self.timers), 'counters': dict(self.counters)}
+
+    def reset(self):
+        self.timers.clear()
+        self.counters.clear()
+
+
+class NullInstrumentation:
+    # Stands in when instrumentation is off: one shared empty context and no bookkeeping
+    __stage = nullcontext()
+
+    def stage(self, name):
+        return NullInstrumentation.__stage
+
+    def count(self, name, value=1):
+        pass
+
+    def stats(self):
+        return None
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+@contextmanager
+def profile(path, sort='cumulative', lines=30, stream=None):
+    # cProfile of the block dumped to path in the pstats format, the profiler is given to the block.
+    # With a stream the first lines of the report sorted by sort are printed to it as well
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        if stream is not None:
+            pstats.Stats(profiler, stream=stream).sort_stats(sort).print_stats(lines)
@@ -1,170 +1,486 @@
 import numpy as np
-from functools import reduce
+import schedule
+from flowshop import FlowShopInstance, DetailItem, DetailSequence
+from exact import BranchAndBound, ParallelBranchAndBound, SubsetDynamicProgramming, multiset_permutations
+import heuristics
+import robustness
+from instrumentation import NULL_INSTRUMENTATION
+import itertools
 import math
-import copy
+import time
 
-
-class DetailItem:
-    def __init__(self, machines_count, machines_processing, name=None):
-        self.name = name
-        self.machines_count = machines_count
-        if not type(machines_processing) is list or len(machines_processing) != machines_count:
-            raise Exception('Wrong machine processing time data')
-        self.machines_processing = machines_processing
-
-    @staticmethod
-    def create_from_multiple_list(data_list):
-        if len(data_list) == 0:
-            raise Exception('Data list is empty')
-        details_count = len(data_list[0, :])
-        data = [DetailItem(len(data_list), data_list[:, i].tolist(), i+1) for i in range(details_count)]
-        return data
+# Rules with inexact surrogate times keep the order of the original comparison sort, ties included,
+# the exact ones take the partition form of Johnson's rule
+SWAP_SORT_RULES = ('first_condition', 'third_condition')
+# Rules whose order is optimal, the others are only bounded from below
+EXACT_RULES = ('two_machines', 'alternative')
 
 
 class Johnson:
     def __init__(self, data):
-        if not type(data) is list:
+        if isinstance(data, FlowShopInstance):
+            self.instance = data
+            self.data = None
+        elif type(data) is list:
+            self.instance = FlowShopInstance.from_details(data)
+            self.data = data
+        else:
             raise Exception('Invalid data list')
-        self.data = data
+        self.sequence = None
+        self.completion = None
+        self.alter_method = False
+        self.method = None
+        self.rule = None
+        self.instrumentation = NULL_INSTRUMENTATION
 
-    def optimize(self, alter_method):
+    def optimize(self, alter_method, exact_method='branch_and_bound', workers=None, prefix_depth=1, chunk_size=1,
+                 progress=None, stop=None, method=None, improvement=None, iterations=100, seed=0, time_limit=None,
+                 node_limit=None, instrumentation=None):
         # Alternative calculation method used if machines count more than 2
-        if all([i.machines_count == 2 for i in self.data]):
-            return self.__johnson_method_2_machines()
-        elif all([i.machines_count == 3 for i in self.data]):
-            return self.__johnson_method_3_machines('alternative' if alter_method else 'ordinary')
+        # Exact method used for 3 machines when Johnson's conditions are not met,
+        # workers, prefix depth and chunk size (prefixes sent to a worker at once) only apply to the parallel one.
+        # progress(nodes, best_makespan) and stop() are polled during the exact search
+        # method is 'johnson' (2 and 3 machines), 'neh' or 'cds' (any machines count),
+        # by default Johnson's method up to 3 machines and NEH for more.
+        # exact_method None keeps the order given by the rule itself for 3 machines.
+        # improvement ('local_search' or 'iterated_greedy', seeded) refines sequences not proven optimal.
+        # time_limit (seconds from this call on) and node_limit bound the search, the best sequence found is
+        # returned with a proven lower bound, the relative gap to it and the optimality flag.
+        # instrumentation (an instrumentation.Instrumentation) collects stage timers and counters,
+        # they are returned in the 'stats' section of the result
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        if method is None:
+            method = 'johnson' if self.instance.machines_count <= 3 else 'neh'
+        exact_options = dict(workers=workers, prefix_depth=prefix_depth, chunk_size=chunk_size, progress=progress,
+                             stop=stop, node_limit=node_limit, deadline=deadline)
+        improvement_options = dict(improvement=improvement, iterations=iterations, seed=seed, deadline=deadline)
+        if instrumentation is not None:
+            self.instrumentation = instrumentation
+        try:
+            with self.instrumentation.stage('optimize'):
+                if method in ('neh', 'cds'):
+                    result = self.__heuristic_method(method, improvement_options)
+                elif method != 'johnson':
+                    raise Exception('Undefined method')
+                elif self.instance.machines_count == 2:
+                    result = self.__johnson_method_2_machines(improvement_options)
+                elif self.instance.machines_count == 3:
+                    result = self.__johnson_method_3_machines('alternative' if alter_method else 'ordinary',
+                                                              exact_method, exact_options, improvement_options)
+                else:
+                    raise Exception('Undefined units count')
+        finally:
+            self.instrumentation = NULL_INSTRUMENTATION
+        if instrumentation is not None:
+            result['stats'] = instrumentation.stats()
+        self.use_sequence(result['sequence'], alter_method, method)
+        return result
+
+    def use_sequence(self, sequence, alter_method=False, method=None):
+        # Current sequence the incremental operations start from, set by optimize; a sequence
+        # restored from elsewhere (a cached result) has to be one optimize would give for the instance
+        if method is None:
+            method = 'johnson' if self.instance.machines_count <= 3 else 'neh'
+        self.sequence = np.asarray(sequence, dtype=int)
+        self.completion = None
+        self.alter_method = alter_method
+        self.method = method
+        # Johnson's rule the sequence is sorted by, new jobs then take their sorted place
+        self.rule = self.__rule()[0] if method == 'johnson' else None
+
+    def insert(self, times, name=None):
+        # Adds a job to the instance and places it into the current sequence, O(n*m):
+        # its place in the order of Johnson's rule when the rule applies, the best insertion otherwise
+        sequence, completion = self.__current()
+        job = self.instance.insert_job(times, name)
+        if self.data is not None:
+            self.data.append(DetailItem(self.instance.machines_count, self.instance.processing[job].tolist(),
+                                        self.instance.names[job].item()))
+        return self.__place(sequence, completion, len(sequence), job)
+
+    def remove(self, index):
+        # Removes a job, the remaining ones keep their order
+        sequence, completion = self.__current()
+        if self.instance.jobs_count == 1:
+            raise Exception('Data list is empty')
+        tied = self.__tied(index)
+        self.instance.remove_job(index)
+        if self.data is not None:
+            del self.data[index]
+        position = int(np.flatnonzero(sequence == index)[0])
+        sequence = np.delete(sequence, position)
+        sequence[sequence > index] -= 1
+        rule, first, second = self.__rule() if self.method == 'johnson' else (None, None, None)
+        if rule is not None and (rule != self.rule or tied):
+            # The removed job was the one breaking Johnson's conditions or a tie holding other jobs back
+            return self.__reorder(rule, first, second)
+        return self.__result(sequence, self.__continue(sequence, completion, position))
+
+    def update(self, index, times):
+        # Changes the processing times of a job and places it again
+        sequence, completion = self.__current()
+        tied = self.__tied(index)
+        self.instance.update_job(index, times)
+        if self.data is not None:
+            self.data[index].machines_processing = self.instance.processing[index].tolist()
+        position = int(np.flatnonzero(sequence == index)[0])
+        return self.__place(np.delete(sequence, position), completion, position, index, tied)
+
+    def __current(self):
+        if self.sequence is None:
+            raise Exception('No sequence to update, optimize first')
+        if self.completion is None:
+            self.completion = schedule.completion_times(self.instance.processing[self.sequence])
+        return self.sequence, self.completion
+
+    def __rule(self):
+        # Surrogate two machines times of the Johnson's rule that is optimal for the instance, None without one
+        times = self.instance.processing
+        if self.instance.machines_count == 2:
+            return 'two_machines', times[:, 0], times[:, 1]
+        if self.instance.machines_count != 3:
+            return None, None, None
+        max_2nd_machine = times[:, 1].max()
+        first_condition = times[:, 0].min() >= max_2nd_machine
+        third_condition = times[:, 2].min() >= max_2nd_machine
+        if self.alter_method:
+            if first_condition or third_condition:
+                return 'alternative', times[:, 0] + times[:, 1], times[:, 1] + times[:, 2]
+        elif first_condition:
+            return 'first_condition', times[:, 0] + times[:, 1], times[:, 2]
+        elif third_condition:
+            return 'third_condition', times[:, 0], times[:, 1] + times[:, 2]
+        return None, None, None
+
+    def __tied(self, index):
+        # The job is a tie of a rule sorted by the original comparison, the place of other jobs depends on it
+        if self.method != 'johnson' or self.rule not in SWAP_SORT_RULES:
+            return False
+        rule, first, second = self.__rule()
+        return rule == self.rule and first[index] == second[index]
+
+    def __place(self, sequence, completion, valid, job, tied=False):
+        # Inserts the job into the sequence, completion times are valid for its first valid positions.
+        # Ties of the comparison sort hold other jobs in their places, with one the order is sorted again
+        times = self.instance.processing
+        rule, first, second = self.__rule() if self.method == 'johnson' else (None, None, None)
+        if rule is not None and (rule != self.rule or tied or rule in SWAP_SORT_RULES and np.any(first == second)):
+            return self.__reorder(rule, first, second)
+        if rule is not None:
+            position = Johnson.__rule_position(first, second, sequence, job)
         else:
-            raise Exception('Undefined units count')
+            completion = self.__continue(sequence, completion, valid)
+            valid = len(sequence)
+            position = int(np.argmin(schedule.insertion_makespans(times[sequence], times[job], completion)))
+        self.rule = rule
+        sequence = np.insert(sequence, position, job)
+        return self.__result(sequence, self.__continue(sequence, completion, min(valid, position)))
+
+    def __reorder(self, rule, first, second):
+        self.rule = rule
+        sequence = self.__johnson_order(first, second, rule in SWAP_SORT_RULES)
+        return self.__result(sequence, schedule.completion_times(self.instance.processing[sequence]))
+
+    def __continue(self, sequence, completion, start):
+        # Completion times of the sequence recomputed from the position start on
+        if start >= len(sequence):
+            return completion[:len(sequence)]
+        initial = completion[start - 1] if start else None
+        return np.vstack((completion[:start], schedule.completion_times(self.instance.processing[sequence[start:]],
+                                                                        initial)))
 
     @staticmethod
-    def __sort(arr, cmp):
-        while True:
-            swapped = False
-            for i in range(0, len(arr) - 1):
-                if cmp(arr[i], arr[i+1]):
-                    arr[i], arr[i+1] = arr[i+1], arr[i]
-                    swapped = True
-            if not swapped:
-                break
-        return arr
-
-    def __johnson_method_2_machines(self):
-        opt = Johnson.__sort([copy.deepcopy(x) for x in self.data], lambda a, b: min(a.machines_processing[0], b.machines_processing[1]) >
-                            min(a.machines_processing[1], b.machines_processing[0]))
-        opt_params = Johnson.__calc_up_downtime(opt, 2)
-        return {
-            'path': opt,
-            'params': opt_params,
-            'delay': Johnson.__find_sum_delay(opt),
-            'duration': Johnson.__find_sum_duration(opt)
+    def __rule_position(first, second, sequence, job):
+        # Place of the job in the order of the rule: jobs with first <= second go ahead by increasing first,
+        # the rest by decreasing second, equal jobs by index as the stable sorts of johnson_order keep them
+        head = first[sequence] <= second[sequence]
+        earlier = sequence < job
+        if first[job] <= second[job]:
+            before = head & ((first[sequence] < first[job]) | (first[sequence] == first[job]) & earlier)
+        else:
+            before = head | (second[sequence] > second[job]) | (second[sequence] == second[job]) & earlier
+        return int(np.count_nonzero(before))
+
+    def __result(self, sequence, completion):
+        times = self.instance.processing
+        opt_times = times[sequence]
+        makespan = float(completion[-1, -1])
+        result = {
+            'sequence': sequence,
+            'path': self.path(sequence),
+            'params': self.__calc_up_downtime(opt_times, completion, sequence),
+            'nodes': None,
+            'stopped': False
+        }
+        if self.instance.machines_count == 2:
+            result['delay'] = Johnson.__find_sum_delay(opt_times, completion)
+            result['duration'] = Johnson.__find_sum_duration(completion)
+        # A sequence sorted by an exact Johnson's rule stays optimal, the rest is only bounded
+        Johnson.__add_bounds(result, makespan, Johnson.__rule_bound(self.rule, times, makespan))
+        self.sequence = sequence
+        self.completion = completion
+        return result
+
+    def evaluate(self, permutations):
+        # Makespans and per machine idle totals of a (k, n) array of job orders of the instance
+        makespans, idle = schedule.evaluate_permutations(self.instance.processing, permutations)
+        return {'makespan': makespans, 'idle': idle}
+
+    def robustness(self, sequences=None, **options):
+        # Makespan and sum_delay percentiles of the sequences (the current one by default) over scenarios
+        # of sampled processing times, see robustness.evaluate_robustness for the noise options
+        if sequences is None:
+            if self.sequence is None:
+                raise Exception('No sequence to evaluate, optimize first')
+            sequences = [self.sequence]
+        return robustness.evaluate_robustness(self.instance.processing, sequences, **options)
+
+    def path(self, sequence):
+        # Original items for a list input, views into the instance array created on access otherwise
+        if self.data is None:
+            return DetailSequence(self.instance, sequence)
+        return [self.data[i] for i in sequence]
+
+    def __johnson_method_2_machines(self, improvement_options=None):
+        times = self.instance.processing
+        opt = self.__johnson_order(times[:, 0], times[:, 1])
+        with self.instrumentation.stage('trace'):
+            opt_times = times[opt]
+            opt_completion = schedule.completion_times(opt_times)
+        duration = Johnson.__find_sum_duration(opt_completion)
+        result = {
+            'sequence': opt,
+            'path': self.path(opt),
+            'params': self.__calc_up_downtime(opt_times, opt_completion, opt),
+            'delay': Johnson.__find_sum_delay(opt_times, opt_completion),
+            'duration': duration,
+            'makespan': duration,
+            'lower_bound': duration,
+            'gap': 0.0,
+            'optimal': True
+        }
+        if improvement_options and improvement_options['improvement']:
+            result['improvement'] = self.__improve(opt, True, **improvement_options)[1]
+        return result
+
+    def __heuristic_method(self, method, improvement_options=None):
+        if self.instance.machines_count < 2:
+            raise Exception('Undefined units count')
+        times = self.instance.processing
+        with self.instrumentation.stage('order'):
+            opt = heuristics.neh(times) if method == 'neh' else heuristics.cds(times)
+        report = None
+        if improvement_options and improvement_options['improvement']:
+            opt, report = self.__improve(opt, False, **improvement_options)
+        result = {
+            'sequence': opt,
+            'path': self.path(opt),
+            'params': self.__calc_up_downtime(times[opt], sequence=opt),
+            'nodes': None,
+            'stopped': report is not None and report['stopped']
+        }
+        Johnson.__add_bounds(result, result['params'].makespan, schedule.lower_bound(times))
+        if report is not None:
+            result['improvement'] = report
+        return result
+
+    def __improve(self, opt, proven, improvement, iterations, seed, deadline=None):
+        # Improvement stage over the constructed sequence, the report compares the makespans before and after
+        times = self.instance.processing
+        if improvement not in ('local_search', 'iterated_greedy'):
+            raise Exception('Undefined improvement method')
+        initial_makespan = schedule.makespan(times[opt])
+        done = 0
+        with self.instrumentation.stage('improvement'):
+            if proven:
+                improved = opt
+            elif improvement == 'local_search':
+                improved = heuristics.insertion_local_search(times, opt, np.random.default_rng(seed))
+            else:
+                time_limit = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                improved, done = heuristics.iterated_greedy(times, opt, iterations, seed=seed, time_limit=time_limit)
+        self.instrumentation.count('improvement_iterations', done)
+        makespan = schedule.makespan(times[improved])
+        if makespan >= initial_makespan:
+            improved, makespan = opt, initial_makespan
+        return improved, {
+            'method': improvement,
+            'initial_makespan': initial_makespan,
+            'makespan': makespan,
+            'gain': initial_makespan - makespan,
+            'searched': not proven,
+            'iterations': done,
+            # The time limit cut the iterations short
+            'stopped': improvement == 'iterated_greedy' and not proven and done < iterations
         }
 
-    def __custom_johnson_method(self, comparator):
-        return Johnson.__sort([copy.deepcopy(x) for x in self.data], comparator)
+    @staticmethod
+    def __rule_bound(rule, times, makespan):
+        # The surrogate times of the ordinary 3 machines rules are not exact even under Johnson's conditions
+        # (jobs [[5, 4, 8], [10, 0, 9]] take 27 in their order, 26 at best), so they do not prove optimality
+        return makespan if rule in EXACT_RULES else schedule.lower_bound(times)
 
-    def __johnson_method_3_machines(self, method='ordinary'):
-        min_1st_machine = min([i.machines_processing[0] for i in self.data])
-        min_3rd_machine = min([i.machines_processing[2] for i in self.data])
-        max_2nd_machine = max([i.machines_processing[1] for i in self.data])
+    @staticmethod
+    def __add_bounds(result, makespan, lower_bound):
+        result['makespan'] = makespan
+        result['lower_bound'] = lower_bound
+        result['gap'] = BranchAndBound.gap(makespan, lower_bound)
+        result['optimal'] = lower_bound >= makespan
+
+    def __exact_method(self, exact_method, exact_options):
+        # Sequence, explored nodes, interruption flag, proven lower bound and Pareto front statistics
+        # (dynamic programming only) of the exact search
+        with self.instrumentation.stage('exact'):
+            if exact_method == 'branch_and_bound':
+                result = BranchAndBound(self.instance.processing, progress=exact_options.get('progress'),
+                                        stop=exact_options.get('stop'), node_limit=exact_options.get('node_limit'),
+                                        deadline=exact_options.get('deadline')).solve()
+            elif exact_method == 'parallel_branch_and_bound':
+                result = ParallelBranchAndBound(self.instance.processing, **exact_options).solve()
+            elif exact_method == 'dynamic_programming':
+                result = SubsetDynamicProgramming(self.instance.processing, progress=exact_options.get('progress'),
+                                                  stop=exact_options.get('stop'),
+                                                  node_limit=exact_options.get('node_limit'),
+                                                  deadline=exact_options.get('deadline')).solve()
+            elif exact_method == 'brute_force':
+                opt, count, stopped, lower_bound = Johnson.__opt_cmb(self.instance.processing,
+                                                                     exact_options.get('deadline'),
+                                                                     exact_options.get('node_limit'))
+                # Every enumerated order is a complete sequence
+                result = dict(sequence=opt, nodes=count, leaves=count, dominated=0, stopped=stopped,
+                              lower_bound=lower_bound)
+            elif exact_method is None:
+                return None, None, False, schedule.lower_bound(self.instance.processing), None
+            else:
+                raise Exception('Undefined exact method')
+        self.instrumentation.count('nodes', result['nodes'])
+        self.instrumentation.count('leaves', result['leaves'])
+        self.instrumentation.count('dominated', result['dominated'])
+        return result['sequence'], result['nodes'], result['stopped'], result['lower_bound'], result.get('fronts')
+
+    def __johnson_method_3_machines(self, method='ordinary', exact_method='branch_and_bound', exact_options=None,
+                                    improvement_options=None):
+        times = self.instance.processing
+        min_1st_machine = times[:, 0].min()
+        min_3rd_machine = times[:, 2].min()
+        max_2nd_machine = times[:, 1].max()
+        nodes = None
+        fronts = None
+        stopped = False
+        # Bound of the exact search, or of the rule applied
+        lower_bound = None
+        rule = None
 
         if method == 'ordinary':
             if min_1st_machine >= max_2nd_machine:
-                opt = self.__custom_johnson_method(lambda a, b: min(a.machines_processing[0] + a.machines_processing[1],
-                                                                    b.machines_processing[2]) >
-                                                                min(a.machines_processing[2], b.machines_processing[0] +
-                                                                    b.machines_processing[1]))
+                rule = 'first_condition'
+                opt = self.__johnson_order(times[:, 0] + times[:, 1], times[:, 2], True)
             elif min_3rd_machine >= max_2nd_machine:
-                opt = self.__custom_johnson_method(lambda a, b: min(a.machines_processing[0], b.machines_processing[1]
-                                                                    + b.machines_processing[2]) >
-                                                                min(a.machines_processing[1] + a.machines_processing[2],
-                                                                    b.machines_processing[0]))
+                rule = 'third_condition'
+                opt = self.__johnson_order(times[:, 0], times[:, 1] + times[:, 2], True)
             else:
-                opt = Johnson.__opt_cmb([copy.deepcopy(x) for x in self.data], 3)
+                opt, nodes, stopped, lower_bound, fronts = self.__exact_method(exact_method, exact_options or {})
+                if opt is None:
+                    opt = min((self.__johnson_order(times[:, 0] + times[:, 1], times[:, 2], True),
+                               self.__johnson_order(times[:, 0], times[:, 1] + times[:, 2], True)),
+                              key=lambda x: schedule.makespan(times[x]))
         elif method == 'alternative':
+            alternative_order = self.__johnson_order(times[:, 0] + times[:, 1], times[:, 1] + times[:, 2])
             if min_1st_machine >= max_2nd_machine or min_3rd_machine >= max_2nd_machine:
-                opt = self.__custom_johnson_method(lambda a, b: min(a.machines_processing[0] + a.machines_processing[1],
-                                                                    b.machines_processing[1] + b.machines_processing[2]) >
-                                                                min(a.machines_processing[1] + a.machines_processing[2],
-                                                                    b.machines_processing[0] + b.machines_processing[1]))
+                rule = 'alternative'
+                opt = alternative_order
             else:
-                opt = Johnson.__opt_cmb([copy.deepcopy(x) for x in self.data], 3)
+                opt, nodes, stopped, lower_bound, fronts = self.__exact_method(exact_method, exact_options or {})
+                if opt is None:
+                    opt = alternative_order
         else:
             raise Exception('Undefined method')
-        opt_params = Johnson.__calc_up_downtime(opt, 3)
+        makespan = schedule.makespan(times[opt])
+        if lower_bound is None:
+            lower_bound = Johnson.__rule_bound(rule, times, makespan)
+        report = None
+        if improvement_options and improvement_options['improvement']:
+            opt, report = self.__improve(opt, lower_bound >= makespan, **improvement_options)
+            makespan = report['makespan']
+        opt_params = self.__calc_up_downtime(times[opt], sequence=opt)
 
-        return {
-            'path': opt,
-            'params': opt_params
+        result = {
+            'sequence': opt,
+            'path': self.path(opt),
+            'params': opt_params,
+            'nodes': nodes,
+            'stopped': stopped or report is not None and report['stopped']
         }
+        Johnson.__add_bounds(result, makespan, lower_bound)
+        if fronts is not None:
+            result['fronts'] = fronts
+        if report is not None:
+            result['improvement'] = report
+        return result
 
     def get_original_params(self):
-        if all([i.machines_count == 2 for i in self.data]):
-            return Johnson.__calc_up_downtime(self.data, 2)
-        elif all([i.machines_count == 3 for i in self.data]):
-            return Johnson.__calc_up_downtime(self.data, 3)
+        if self.instance.machines_count >= 2:
+            return self.__calc_up_downtime(self.instance.processing)
         else:
             raise Exception('Undefined units count')
 
-    @staticmethod
-    def __calc_up_downtime(data, machine_count, prev_machine=0, tracing=None):
-        if machine_count == 0 or prev_machine + 1 == machine_count:
-            return
-        if tracing is None:
-            start_work_times = [i.machines_processing[0] for i in data]
-            tasks = []
-            for i in range(len(data)):
-                prev_tasks_duration = sum([start_work_times[j] for j in range(len(start_work_times)) if j < i])
-                tasks.append({'delay': {'starts': prev_tasks_duration, 'duration': 0},
-                              'activity': {'starts': prev_tasks_duration, 'duration': start_work_times[i]}})
-            tracing = {'0': {'tasks': tasks, 'sum_delay': 0, 'sum_working': sum(start_work_times)}}
-        curr_machine = prev_machine + 1
-        delays = []
-        for i in range(len(data)):
-            delay = max(sum([data[x].machines_processing[prev_machine] for x in range(len(data)) if x <= i]) -
-                        sum([data[x].machines_processing[curr_machine] for x in range(len(data)) if x < i]) - sum(delays), 0)
-            delays.append(delay)
-        current_work_times = [data[i].machines_processing[curr_machine] for i in range(len(data))]
-        tasks = []
-        prev_detail_time_end = 0
-        for i in range(len(data)):
-            tasks.append(dict(delay=dict(starts=prev_detail_time_end, duration=delays[i]),
-                        activity=dict(starts=prev_detail_time_end + delays[i], duration=current_work_times[i])))
-            prev_detail_time_end += delays[i] + current_work_times[i]
-        tracing[str(curr_machine)] = {
-            'tasks': tasks, 'sum_delay': sum(delays), 'sum_working': sum(current_work_times) + sum(delays)
-        }
-        next_data = []
-        for i in data:
-            next_data.append(copy.deepcopy(i))
-        for i in range(len(data)):
-            next_data[i].machines_processing[curr_machine] += delays[i]
-        Johnson.__calc_up_downtime(next_data, machine_count, prev_machine+1, tracing)
-        return tracing
+    def __calc_up_downtime(self, processing, completion=None, sequence=None):
+        # Lazy timeline, the per task dicts are only built for the parts of it that are read
+        self.instrumentation.count('traces')
+        with self.instrumentation.stage('trace'):
+            return schedule.trace(processing, completion, sequence)
+
+    def __johnson_order(self, first, second, swap_sort=False):
+        # Vectorized sorts do not expose their comparisons, the jobs sorted are counted instead
+        self.instrumentation.count('sorts')
+        self.instrumentation.count('sorted_jobs', len(first))
+        with self.instrumentation.stage('order'):
+            if swap_sort:
+                return schedule.swap_sort_order(first, second)
+            return schedule.johnson_order(first, second)
 
     @staticmethod
-    def __find_sum_delay(data):
-        return max([reduce(lambda p, c: p+c.machines_processing[0], data[:i], 0) -
-                    reduce(lambda p, c: p+c.machines_processing[1], data[:i-1], 0) for i in range(len(data))])
+    def __find_sum_delay(times, completion):
+        # Total idle time of the second machine
+        return float(completion[-1, 1] - times[:, 1].sum())
 
     @staticmethod
-    def __find_sum_duration(data):
-        return sum([i.machines_processing[1] for i in data]) + Johnson.__find_sum_delay(data)
+    def __find_sum_duration(completion):
+        return float(completion[-1, 1])
 
     @staticmethod
-    def __opt_cmb(data, units_count, prev=None, index=0, opt_path=None):
-        if prev is None:
-            prev = [0 for _ in range(len(data))]
-        if opt_path is None:
-            opt_path = dict(duration=math.inf, path=None)
-        if not len(data):
-            properties = Johnson.__calc_up_downtime(prev, units_count)
-            max_duration = max([properties[i]['sum_working'] for i in properties])
-            # print(','.join([str(i.name) for i in prev]), ', d=', str(max_duration))
-            if opt_path['duration'] > max_duration:
-                opt_path['duration'] = max_duration
-                opt_path['path'] = [copy.deepcopy(x) for x in prev]
-        else:
-            for i in range(len(data)):
-                prev[index] = copy.deepcopy(data[i])
-                Johnson.__opt_cmb(data[:i] + data[i + 1:], units_count, prev, index+1, opt_path)
-        return opt_path['path']
+    def __opt_cmb(processing, deadline=None, node_limit=None, chunk_size=4096):
+        # Full enumeration of job orders, the first order with the least makespan wins.
+        # Identical jobs are interchangeable, so only the distinct orders of job types are enumerated,
+        # jobs of a type taking its places by increasing index.
+        # Orders are scored by chunks in one vectorized pass each.
+        # Out of budget (a time.perf_counter() deadline, orders enumerated) it keeps the best order seen,
+        # bounded from below by the branch and bound root bound
+        jobs_count = len(processing)
+        types = np.unique(processing, axis=0, return_inverse=True)[1].reshape(-1)
+        jobs_by_type = np.argsort(types, kind='stable')
+        permutations = multiset_permutations(types.tolist())
+        opt_path = dict(duration=math.inf, path=None)
+        count = 0
+        stopped = False
+        while True:
+            size = chunk_size if node_limit is None else max(min(chunk_size, node_limit - count), 0)
+            if opt_path['path'] is not None and (size == 0 or deadline is not None and time.perf_counter() >= deadline):
+                stopped = True
+                break
+            labels = np.fromiter(itertools.chain.from_iterable(itertools.islice(permutations, max(size, 1))),
+                                 dtype=int).reshape(-1, jobs_count)
+            if len(labels) == 0:
+                break
+            chunk = np.empty_like(labels)
+            np.put_along_axis(chunk, np.argsort(labels, axis=1, kind='stable'), jobs_by_type[None, :], axis=1)
+            count += len(chunk)
+            makespans = schedule.evaluate_permutations(processing, chunk)[0]
+            best = int(np.argmin(makespans))
+            if opt_path['duration'] > makespans[best]:
+                opt_path['duration'] = float(makespans[best])
+                opt_path['path'] = chunk[best]
+        # Budget exhausted right after the last order is not an interruption
+        stopped = stopped and next(permutations, None) is not None
+        lower_bound = BranchAndBound(processing).lower_bound() if stopped else opt_path['duration']
+        return np.array(opt_path['path'], dtype=int), count, stopped, lower_bound
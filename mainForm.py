@@ -45,6 +45,9 @@ class Ui_mainForm(object):
         palette.setBrush(QtGui.QPalette.Disabled, QtGui.QPalette.Button, brush)
         self.startCalculationButton.setPalette(palette)
         self.startCalculationButton.setObjectName("startCalculationButton")
+        self.cancelCalculationButton = QtWidgets.QPushButton(self.groupBox)
+        self.cancelCalculationButton.setGeometry(QtCore.QRect(420, 250, 91, 25))
+        self.cancelCalculationButton.setObjectName("cancelCalculationButton")
         self.saveButton = QtWidgets.QPushButton(self.groupBox)
         self.saveButton.setGeometry(QtCore.QRect(110, 250, 89, 25))
         self.saveButton.setObjectName("saveButton")
@@ -67,6 +70,9 @@ class Ui_mainForm(object):
         self.diagramLabel.setEnabled(False)
         self.diagramLabel.setGeometry(QtCore.QRect(540, 30, 112, 17))
         self.diagramLabel.setObjectName("diagramLabel")
+        self.exportDiagramButton = QtWidgets.QPushButton(mainForm)
+        self.exportDiagramButton.setGeometry(QtCore.QRect(540, 2, 151, 25))
+        self.exportDiagramButton.setObjectName("exportDiagramButton")
 
         self.retranslateUi(mainForm)
         QtCore.QMetaObject.connectSlotsByName(mainForm)
@@ -78,9 +84,11 @@ class Ui_mainForm(object):
         self.label.setText(_translate("mainForm", "Количество агрегатов"))
         self.label_2.setText(_translate("mainForm", "Количество деталей"))
         self.startCalculationButton.setText(_translate("mainForm", "Рассчитать"))
+        self.cancelCalculationButton.setText(_translate("mainForm", "Отменить"))
         self.saveButton.setText(_translate("mainForm", "Сохранить"))
         self.loadButton.setText(_translate("mainForm", "Загрузить"))
         self.alterMethodCheckBox.setToolTip(_translate("mainForm", "<html><head/><body><p>При установке данного флага производится расчет оптимальной последовательности по суммам Ai+Bi и Bi+Ci</p></body></html>"))
         self.alterMethodCheckBox.setText(_translate("mainForm", "Альтернативный метод"))
         self.groupBox_2.setTitle(_translate("mainForm", "Результат оптимизации"))
         self.diagramLabel.setText(_translate("mainForm", "Нет диаграммы"))
+        self.exportDiagramButton.setText(_translate("mainForm", "Экспорт диаграммы"))
@@ -0,0 +1,98 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import schedule
+
+# Monte Carlo evaluation of job orders under uncertain processing times.
+# Every order is scored on the same sampled scenarios, so their percentiles compare directly.
+
+NOISE_MODELS = ('normal', 'lognormal', 'uniform')
+
+
+def sample_scenarios(processing, count, noise='normal', spread=0.1, rng=None):
+    # (count, n, m) sampled processing times around the nominal ones. spread is the relative deviation,
+    # a scalar or an array broadcast to (n, m) for per job / per machine noise:
+    # 'normal' standard deviation clipped at zero, 'lognormal' sigma keeping the mean, 'uniform' half width.
+    # noise may also be a callable noise(rng, processing, count) returning the samples
+    processing = np.asarray(processing, dtype=float)
+    if rng is None:
+        rng = np.random.default_rng()
+    if callable(noise):
+        samples = np.asarray(noise(rng, processing, count), dtype=float)
+        if samples.shape != (count,) + processing.shape:
+            raise Exception('Noise model returned samples of a wrong shape')
+        return samples
+    spread = np.broadcast_to(np.asarray(spread, dtype=float), processing.shape)
+    if np.any(spread < 0):
+        raise Exception('Spread must be non-negative')
+    shape = (count,) + processing.shape
+    if noise == 'normal':
+        samples = processing * (1 + spread * rng.standard_normal(shape))
+        return np.maximum(samples, 0, out=samples)
+    elif noise == 'lognormal':
+        return processing * np.exp(spread * rng.standard_normal(shape) - spread ** 2 / 2)
+    elif noise == 'uniform':
+        samples = processing * (1 + spread * rng.uniform(-1, 1, shape))
+        return np.maximum(samples, 0, out=samples)
+    raise Exception('Undefined noise model')
+
+
+def evaluate_robustness(processing, sequences, scenarios=10000, noise='normal', spread=0.1, seed=0,
+                        percentiles=(5, 50, 90, 95, 99), criterion=90, workers=1, memory_limit=64 * 2 ** 20):
+    # Makespan and per machine idle time (sum_delay) distributions of every sequence over the scenarios.
+    # Scenarios are drawn by chunks within memory_limit bytes, each chunk from its own seed spawned from
+    # seed, so the result does not depend on the number of worker processes.
+    # The most robust sequence is the one with the least makespan percentile given by criterion
+    processing = np.asarray(processing, dtype=float)
+    if processing.ndim != 2 or processing.shape[0] == 0:
+        raise Exception('Processing times must be a non-empty 2D matrix')
+    sequences = np.atleast_2d(np.asarray(sequences, dtype=int))
+    if sequences.shape[1] != processing.shape[0]:
+        raise Exception('Sequences must be (k, n) job orders of the instance')
+    if scenarios < 1:
+        raise Exception('Scenarios count must be positive')
+    if workers is not None and workers < 1:
+        raise Exception('Workers count must be positive')
+    # The samples and their reordered copy
+    chunk_size = int(max(1, min(scenarios, memory_limit // (2 * 8 * processing.size))))
+    counts = [min(chunk_size, scenarios - i) for i in range(0, scenarios, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    tasks = [(processing, sequences, noise, spread, i, count) for i, count in zip(seeds, counts)]
+    if workers == 1 or len(tasks) == 1:
+        parts = [_evaluate_chunk(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            parts = list(executor.map(_evaluate_chunk, *zip(*tasks)))
+    makespans = np.concatenate([i[0] for i in parts], axis=1)
+    idle = np.concatenate([i[1] for i in parts], axis=1)
+
+    percentiles = list(percentiles)
+    if criterion not in percentiles:
+        percentiles.append(criterion)
+    makespan_percentiles = np.percentile(makespans, percentiles, axis=1)
+    idle_percentiles = np.percentile(idle, percentiles, axis=1)
+    nominal_makespans, nominal_idle = schedule.evaluate_batch(processing[sequences])
+    results = []
+    for i in range(len(sequences)):
+        results.append({
+            'sequence': sequences[i],
+            'nominal_makespan': float(nominal_makespans[i]),
+            'mean': float(makespans[i].mean()),
+            'std': float(makespans[i].std()),
+            'percentiles': {p: float(makespan_percentiles[j, i]) for j, p in enumerate(percentiles)},
+            'sum_delay': {
+                'nominal': nominal_idle[i],
+                'mean': idle[i].mean(axis=0),
+                'percentiles': {p: idle_percentiles[j, i] for j, p in enumerate(percentiles)}
+            }
+        })
+    best = int(np.argmin(makespan_percentiles[percentiles.index(criterion)]))
+    return {'scenarios': scenarios, 'criterion': criterion, 'best': best, 'sequences': results}
+
+
+def _evaluate_chunk(processing, sequences, noise, spread, seed, count):
+    samples = sample_scenarios(processing, count, noise, spread, np.random.default_rng(seed))
+    makespans = np.empty((len(sequences), count))
+    idle = np.empty((len(sequences), count, processing.shape[1]))
+    for i, sequence in enumerate(sequences):
+        makespans[i], idle[i] = schedule.evaluate_batch(samples[:, sequence])
+    return makespans, idle
@@ -0,0 +1,288 @@
+from collections.abc import Mapping, Sequence
+import numpy as np
+
+# Orders of evaluate_permutations are evaluated in chunks of about this many bytes, larger ones leave the cache
+EVALUATION_CHUNK_BYTES = 2 ** 20
+
+
+def johnson_order(first, second):
+    # Partition form of Johnson's rule: jobs with first <= second ascending by first,
+    # the rest descending by second. Stable sorts keep the input order on ties
+    first = np.asarray(first, dtype=float)
+    second = np.asarray(second, dtype=float)
+    head = np.flatnonzero(first <= second)
+    tail = np.flatnonzero(first > second)
+    head = head[np.argsort(first[head], kind='stable')]
+    tail = tail[np.argsort(-second[tail], kind='stable')]
+    return np.concatenate((head, tail))
+
+
+def swap_sort_order(first, second):
+    # Order the original adjacent swap sort with Johnson's comparison ends in: a job moves ahead of its
+    # neighbour when min(neighbour first, own second) > min(neighbour second, own first). The swaps always
+    # end in the same order. Jobs with first == second (ties) never pass each other, and no job passes a tie
+    # not above its key min(first, second). So every other job stays in its slot between the nearest ties
+    # at most its key, at the front of it by increasing first when first < second, at the back by
+    # decreasing second otherwise, the jobs of a wider slot outside the narrower ones. Without ties this
+    # is johnson_order
+    first = np.asarray(first, dtype=float)
+    second = np.asarray(second, dtype=float)
+    ties = first == second
+    if not ties.any():
+        return johnson_order(first, second)
+    jobs_count = len(first)
+    keys = np.minimum(first, second)
+    positions = np.flatnonzero(ties)
+    left = _nearest_ties(keys[positions], np.searchsorted(positions, np.arange(jobs_count)), keys)
+    right = _nearest_ties(keys[positions][::-1], np.searchsorted(-positions[::-1], -np.arange(jobs_count)), keys)
+    left = np.where(left < 0, -1, positions[np.maximum(left, 0)])
+    right = np.where(right < 0, jobs_count, positions[::-1][np.maximum(right, 0)])
+    head = first < second
+    # Place of every job: the tie it is next to, before it (0), the tie itself (1) or after it (2),
+    # the nesting of the slots and the order within a slot
+    anchor = np.where(ties, np.arange(jobs_count), np.where(head, left, right))
+    part = np.where(ties, 1, np.where(head, 2, 0))
+    nesting = np.where(ties, 0, np.where(head, -right, -left))
+    value = np.where(ties, 0.0, np.where(head, first, -second))
+    return np.lexsort((np.arange(jobs_count), value, nesting, part, anchor))
+
+
+def _nearest_ties(tie_keys, counts, keys):
+    # Index in tie_keys of the last tie among the first counts[i] ones with a key at most keys[i], -1 without
+    # one. Binary lifting over a sparse table of range minimums, O(n log n) for all jobs at once
+    table = [tie_keys]
+    while 2 ** len(table) <= len(tie_keys):
+        previous, step = table[-1], 2 ** (len(table) - 1)
+        table.append(np.minimum(previous[:-step], previous[step:]))
+    found = counts.copy()
+    for level in range(len(table) - 1, -1, -1):
+        step = 2 ** level
+        start = found - step
+        valid = start >= 0
+        minimums = np.full(len(found), -np.inf)
+        minimums[valid] = table[level][start[valid]]
+        # The whole range of ties skipped is above the key
+        found = np.where(valid & (minimums > keys), start, found)
+    return found - 1
+
+
+def completion_times(processing, initial=None):
+    # C[j, k] = max(C[j-1, k], C[j, k-1]) + p[j, k] for an (n_jobs x n_machines) matrix.
+    # Unrolled per machine as C[:, k] = S[j] + max_{i<=j}(C[i, k-1] - S[i-1]), S being
+    # the prefix sums of the machine column, so every machine costs a single O(n) pass.
+    # initial is the completion vector of the jobs scheduled before, to continue a sequence
+    processing = np.asarray(processing, dtype=float)
+    if processing.ndim != 2:
+        raise Exception('Processing times must be a 2D matrix')
+    completion = np.empty_like(processing)
+    if processing.shape[0] == 0:
+        return completion
+    if initial is None:
+        initial = np.zeros(processing.shape[1])
+    completion[:, 0] = initial[0] + np.cumsum(processing[:, 0])
+    for k in range(1, processing.shape[1]):
+        prefix = np.cumsum(processing[:, k])
+        completion[:, k] = prefix + np.maximum(initial[k], np.maximum.accumulate(completion[:, k - 1] - prefix +
+                                                                                 processing[:, k]))
+    return completion
+
+
+def makespan(processing):
+    processing = np.asarray(processing, dtype=float)
+    if processing.shape[0] == 0:
+        return 0.0
+    return float(completion_times(processing)[-1, -1])
+
+
+def idle_times(processing, completion=None):
+    # Idle time before every job on every machine
+    processing = np.asarray(processing, dtype=float)
+    if completion is None:
+        completion = completion_times(processing)
+    previous_ends = np.zeros_like(completion)
+    previous_ends[1:] = completion[:-1]
+    return completion - processing - previous_ends
+
+
+def trace(processing, completion=None, sequence=None):
+    # Per machine timeline in the {'0': {'tasks', 'sum_delay', 'sum_working'}, ...} layout, built lazily
+    return Timeline(processing, completion, sequence)
+
+
+class Timeline(Mapping):
+    # Keeps only the processing and completion matrices of the sequence (and its job order when given),
+    # the entry of a machine is built when it is read and its tasks are built one by one when they are read
+    def __init__(self, processing, completion=None, sequence=None):
+        self.processing = np.asarray(processing, dtype=float)
+        self.completion = completion_times(self.processing) if completion is None else completion
+        self.sequence = sequence
+        self.__idle = None
+
+    @property
+    def idle(self):
+        if self.__idle is None:
+            self.__idle = idle_times(self.processing, self.completion)
+        return self.__idle
+
+    @property
+    def makespan(self):
+        return float(self.completion[-1, -1]) if len(self.completion) else 0.0
+
+    def __getitem__(self, key):
+        k = int(key)
+        if str(k) != key or k < 0 or k >= self.processing.shape[1]:
+            raise KeyError(key)
+        return {
+            'tasks': MachineTasks(self.completion[:, k] - self.processing[:, k], self.processing[:, k],
+                                  self.idle[:, k]),
+            'sum_delay': float(self.idle[:, k].sum()),
+            'sum_working': float(self.completion[-1, k]) if len(self.completion) else 0.0
+        }
+
+    def __iter__(self):
+        return (str(k) for k in range(self.processing.shape[1]))
+
+    def __len__(self):
+        return self.processing.shape[1]
+
+    def columns(self):
+        # Columnar export: (n_jobs x n_machines) matrices of the timeline and per machine totals
+        starts = self.completion - self.processing
+        result = {
+            'activity_starts': starts,
+            'activity_duration': self.processing,
+            'delay_starts': starts - self.idle,
+            'delay_duration': self.idle,
+            'completion': self.completion,
+            'sum_delay': self.idle.sum(axis=0),
+            'sum_working': self.completion[-1] if len(self.completion) else np.zeros(self.processing.shape[1])
+        }
+        if self.sequence is not None:
+            result['sequence'] = np.asarray(self.sequence)
+        return result
+
+    def to_dict(self):
+        # The eager layout of nested dicts and lists
+        return {key: dict(value, tasks=list(value['tasks'])) for key, value in self.items()}
+
+
+class MachineTasks(Sequence):
+    # Tasks of one machine as {'delay': {'starts', 'duration'}, 'activity': {'starts', 'duration'}} dicts
+    def __init__(self, starts, durations, delays):
+        self.starts = starts
+        self.durations = durations
+        self.delays = delays
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return dict(delay=dict(starts=float(self.starts[index] - self.delays[index]),
+                               duration=float(self.delays[index])),
+                    activity=dict(starts=float(self.starts[index]), duration=float(self.durations[index])))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __eq__(self, other):
+        return isinstance(other, Sequence) and list(self) == list(other)
+
+
+def tails(processing):
+    # Q[j, k]: time from the start of job j on machine k to the end of the schedule, heads of the reversed problem
+    processing = np.asarray(processing, dtype=float)
+    return completion_times(processing[::-1, ::-1])[::-1, ::-1]
+
+
+def insertion_makespans(processing, job, completion=None, tail=None):
+    # Makespans of inserting the job (a row of machine times) at every position 0..n of the sequence,
+    # Taillard's acceleration: with heads E and tails Q of the sequence, the inserted job completes at
+    # F[i, k] = max(F[i, k-1], E[i-1, k]) + p[k] and the makespan is max_k(F[i, k] + Q[i, k]), O(n*m) in total
+    processing = np.asarray(processing, dtype=float)
+    job = np.asarray(job, dtype=float)
+    if completion is None:
+        completion = completion_times(processing)
+    if tail is None:
+        tail = tails(processing)
+    count, machines_count = processing.shape
+    heads = np.zeros((count + 1, machines_count))
+    heads[1:] = completion
+    after = np.zeros((count + 1, machines_count))
+    after[:-1] = tail
+    finish = np.empty((count + 1, machines_count))
+    finish[:, 0] = heads[:, 0] + job[0]
+    for k in range(1, machines_count):
+        finish[:, k] = np.maximum(finish[:, k - 1], heads[:, k]) + job[k]
+    return (finish + after).max(axis=1)
+
+
+def lower_bound(processing):
+    # Machine based bound: the work of machine k plus the least head before it and the least tail after it,
+    # and the longest job; O(n*m), no sequence can be shorter
+    processing = np.asarray(processing, dtype=float)
+    return float(lower_bounds(processing[None])[0])
+
+
+def lower_bounds(processing, mask=None):
+    # lower_bound of every (n, m) instance of a (k, n, m) array, mask (k, n) leaves padding jobs out
+    processing = np.asarray(processing, dtype=float)
+    count, jobs_count = processing.shape[:2]
+    if mask is None:
+        mask = np.ones((count, jobs_count), dtype=bool)
+    if jobs_count == 0:
+        return np.zeros(count)
+    valid = mask[:, :, None]
+    processing = np.where(valid, processing, 0.0)
+    heads = np.cumsum(processing, axis=2) - processing
+    rests = np.cumsum(processing[:, :, ::-1], axis=2)[:, :, ::-1] - processing
+    machines = (processing.sum(axis=1) + np.where(valid, heads, np.inf).min(axis=1) +
+                np.where(valid, rests, np.inf).min(axis=1))
+    bounds = np.maximum(machines.max(axis=1), processing.sum(axis=2).max(axis=1))
+    return np.where(mask.any(axis=1), bounds, 0.0)
+
+
+def evaluate_permutations(processing, permutations, memory_limit=64 * 2 ** 20):
+    # Makespans (k,) and total idle times of every machine (k, m) for a (k, n) array of job orders.
+    # Chunks of orders are gathered into ordered matrices for evaluate_batch, machine by machine so that
+    # the recurrence reads contiguous rows; chunks keep the working arrays within memory_limit bytes
+    processing = np.asarray(processing, dtype=float)
+    permutations = np.asarray(permutations)
+    if permutations.ndim != 2 or permutations.shape[1] != processing.shape[0]:
+        raise Exception('Permutations must be a (k, n) matrix of job indexes')
+    count, jobs_count = permutations.shape
+    machines_count = processing.shape[1]
+    if jobs_count == 0:
+        return np.zeros(count), np.zeros((count, machines_count))
+    # The gathered chunk and three (chunk, n) float arrays are alive at a time
+    chunk_size = max(1, min(memory_limit, EVALUATION_CHUNK_BYTES) // ((machines_count + 3) * 8 * jobs_count))
+    columns = np.ascontiguousarray(processing.T)
+    makespans = np.empty(count)
+    idle = np.empty((count, machines_count))
+    for starts in range(0, count, chunk_size):
+        chunk = permutations[starts:starts + chunk_size]
+        ordered = np.moveaxis(np.take(columns, chunk, axis=1), 0, -1)
+        makespans[starts:starts + len(chunk)], idle[starts:starts + len(chunk)] = evaluate_batch(ordered)
+    return makespans, idle
+
+
+def evaluate_batch(processing):
+    # Makespans (k,) and idle times of every machine (k, m) of k ordered (n, m) processing matrices,
+    # the completion_times recurrence runs over the job axis of all of them at once.
+    # Zero times padding the end of a sequence change neither its makespan nor its idle times
+    processing = np.asarray(processing, dtype=float)
+    count, jobs_count, machines_count = processing.shape
+    last = np.zeros((count, machines_count))
+    # Work of every machine, the idle time is its last completion less its work
+    work = np.zeros((count, machines_count))
+    if jobs_count:
+        completion = np.cumsum(processing[:, :, 0], axis=1)
+        last[:, 0] = work[:, 0] = completion[:, -1]
+        for k in range(1, machines_count):
+            times = processing[:, :, k]
+            prefix = np.cumsum(times, axis=1)
+            work[:, k] = prefix[:, -1]
+            completion -= prefix
+            completion += times
+            np.maximum.accumulate(completion, axis=1, out=completion)
+            completion += prefix
+            last[:, k] = completion[:, -1]
+    return last[:, -1].copy(), last - work
@@ -1,26 +1,113 @@
 import numpy as np
 import json
+import os
+import struct
+import zipfile
+from flowshop import MACHINES_COUNT_VARIANTS
 
 
 class Serializer:
+    # '.json' keeps everything as text, '.npz' stores 'initial_queue' as a binary array next to a JSON header,
+    # '.npy' holds the bare 'initial_queue' matrix
+    formats = ('.json', '.npz', '.npy')
 
     @staticmethod
     def serialize(path, data):
         if not isinstance(data, dict):
             raise Exception('Data has incorrect format')
-        for i in data:
-            if isinstance(data[i], np.ndarray):
-                data[i] = data[i].tolist()
+        extension = os.path.splitext(path)[1].lower()
         try:
-            file = open(path, 'w')
+            if extension == '.npz':
+                Serializer.__serialize_npz(path, data)
+            elif extension == '.npy':
+                Serializer.__serialize_npy(path, data)
+            else:
+                Serializer.__serialize_json(path, data)
         except OSError:
             raise Exception('File not found')
-        json.dump(data, file)
 
     @staticmethod
-    def deserialize(path):
+    def deserialize(path, mmap=True):
+        # Binary matrices are memory-mapped read-only unless mmap is False
+        extension = os.path.splitext(path)[1].lower()
         try:
-            file = open(path)
+            if extension == '.npz':
+                return Serializer.__deserialize_npz(path, mmap)
+            elif extension == '.npy':
+                return Serializer.__deserialize_npy(path, mmap)
+            return Serializer.__deserialize_json(path)
         except OSError:
             raise Exception('File not found')
-        return json.load(file)
\ No newline at end of file
+
+    @staticmethod
+    def __serialize_json(path, data):
+        data = {i: data[i].tolist() if isinstance(data[i], np.ndarray) else data[i] for i in data}
+        with open(path, 'w') as file:
+            json.dump(data, file)
+
+    @staticmethod
+    def __deserialize_json(path):
+        with open(path) as file:
+            return json.load(file)
+
+    @staticmethod
+    def __queue_array(data):
+        # Machines by rows stored in Fortran order: the transposed (details x machines) matrix
+        # the solver works on is then C-contiguous and needs no copy after loading
+        return np.asfortranarray(np.asarray(data['initial_queue'], dtype=float))
+
+    @staticmethod
+    def __serialize_npz(path, data):
+        header = {i: data[i].tolist() if isinstance(data[i], np.ndarray) else data[i]
+                  for i in data if i != 'initial_queue'}
+        # Stored without compression so that the matrix can be mapped straight from the archive
+        with open(path, 'wb') as file:
+            np.savez(file, initial_queue=Serializer.__queue_array(data), header=np.array(json.dumps(header)))
+
+    @staticmethod
+    def __deserialize_npz(path, mmap):
+        with zipfile.ZipFile(path) as archive:
+            with archive.open('header.npy') as file:
+                header = json.loads(np.lib.format.read_array(file).item())
+            info = archive.getinfo('initial_queue.npy')
+            if not mmap or info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as file:
+                    header['initial_queue'] = np.lib.format.read_array(file)
+                return header
+        with open(path, 'rb') as file:
+            # Local file header: fixed 30 bytes, then the name and the extra field
+            file.seek(info.header_offset)
+            local_header = file.read(30)
+            name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+            file.seek(info.header_offset + 30 + name_length + extra_length)
+            header['initial_queue'] = Serializer.__map_array(path, file)
+        return header
+
+    @staticmethod
+    def __serialize_npy(path, data):
+        np.save(path, Serializer.__queue_array(data))
+
+    @staticmethod
+    def __deserialize_npy(path, mmap):
+        queue = np.load(path, mmap_mode='r' if mmap else None)
+        if queue.ndim != 2:
+            raise Exception('Data has incorrect format')
+        machines_count_variants = list(MACHINES_COUNT_VARIANTS)
+        if str(queue.shape[0]) not in machines_count_variants:
+            machines_count_variants.append(str(queue.shape[0]))
+        return {
+            'initial_queue': queue,
+            'machines_count_variants': machines_count_variants,
+            'machines_count_selected_index': machines_count_variants.index(str(queue.shape[0])),
+            'details_count': queue.shape[1]
+        }
+
+    @staticmethod
+    def __map_array(path, file):
+        version = np.lib.format.read_magic(file)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+        return np.memmap(path, dtype=dtype, mode='r', offset=file.tell(), shape=shape,
+                         order='F' if fortran_order else 'C')
@@ -0,0 +1,293 @@
+import argparse
+import asyncio
+import collections
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from cache import SolutionCache
+from cli import summary
+from flowshop import FlowShopInstance
+from johnson import Johnson
+
+# JSON over HTTP around Johnson.optimize for clients that should not embed the solver (and PyQt5 with it).
+#   POST /solve   {"initial_queue": [[...], ...]} machines by rows as in instance files,
+#                 or {"processing": [[...], ...]} jobs by rows, plus optimize options
+#   GET /stats    counters and latency percentiles
+#   GET /health
+
+OPTIONS = ('alter_method', 'exact_method', 'method', 'improvement', 'iterations', 'seed', 'time_limit', 'node_limit')
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+               503: 'Service Unavailable'}
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+def solve_processing(processing, options):
+    # Runs in a worker process: the result is reduced to plain JSON values there
+    instance = FlowShopInstance(processing)
+    johnson = Johnson(instance)
+    options = dict(options)
+    alter_method = options.pop('alter_method', False)
+    opt = johnson.optimize(alter_method, **options)
+    return summary(instance, opt, johnson.get_original_params())
+
+
+class SchedulingService:
+    def __init__(self, workers=None, queue_size=64, cache_size=256, latency_window=10000, max_body=64 * 2 ** 20):
+        if queue_size < 1:
+            raise Exception('Queue size must be positive')
+        self.workers = workers or os.cpu_count() or 1
+        # Solves waiting for a worker: distinct requests beyond workers + queue_size running or queued
+        # solves are rejected, the queue itself is not bounded so that idle workers always count
+        self.queue_size = queue_size
+        self.max_body = max_body
+        self.cache = SolutionCache(cache_size)
+        self.executor = None
+        self.queue = None
+        self.dispatchers = []
+        # Futures of the solves queued or running, identical requests wait for the same one
+        self.inflight = {}
+        self.latencies = collections.deque(maxlen=latency_window)
+        self.counters = collections.Counter()
+
+    async def start(self):
+        # Forked workers would inherit the client sockets open at the time and keep them from closing,
+        # so they come from a fork server (spawned on Windows) and are all started before serving
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(method))
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self.executor, os.getpid) for _ in range(self.workers)])
+        self.queue = asyncio.Queue()
+        self.dispatchers = [asyncio.create_task(self.__dispatch()) for _ in range(self.workers)]
+
+    async def close(self):
+        for dispatcher in self.dispatchers:
+            dispatcher.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        self.dispatchers = []
+        for future in self.inflight.values():
+            if not future.done():
+                future.set_exception(Exception('Service stopped'))
+        self.inflight.clear()
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    async def solve(self, request):
+        # Result of the request, identical concurrent requests share a single solve
+        started = time.perf_counter()
+        self.counters['requests'] += 1
+        try:
+            processing, options = SchedulingService.parse(request)
+            key = SchedulingService.key(processing, options)
+            result = self.cache.get(key[0])
+            if result is None:
+                future = self.inflight.get(key)
+                if future is None:
+                    if len(self.inflight) >= self.workers + self.queue_size:
+                        self.counters['rejected'] += 1
+                        raise ServiceBusy('Too many requests in the queue')
+                    future = asyncio.get_running_loop().create_future()
+                    self.queue.put_nowait((processing, options, future))
+                    self.inflight[key] = future
+                    future.add_done_callback(lambda _: self.inflight.pop(key, None))
+                else:
+                    self.counters['coalesced'] += 1
+                # A cancelled client must not cancel the solve shared with the others
+                result = await asyncio.shield(future)
+                # Only complete results are solutions of the instance whatever the budget
+                if not result['stopped']:
+                    self.cache.put(key[0], result)
+            else:
+                self.counters['cached'] += 1
+        except ServiceBusy:
+            raise
+        except Exception:
+            self.counters['failed'] += 1
+            raise
+        self.latencies.append(time.perf_counter() - started)
+        return result
+
+    def stats(self):
+        latencies = np.array(self.latencies)
+        latency = {'count': len(latencies)}
+        if len(latencies):
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            latency.update(p50=float(p50), p90=float(p90), p99=float(p99), max=float(latencies.max()))
+        return {
+            'requests': self.counters['requests'],
+            'solves': self.counters['solves'],
+            'coalesced': self.counters['coalesced'],
+            'cached': self.counters['cached'],
+            'rejected': self.counters['rejected'],
+            'failed': self.counters['failed'],
+            'queued': self.queue.qsize() if self.queue is not None else 0,
+            'inflight': len(self.inflight),
+            'workers': self.workers,
+            'latency': latency
+        }
+
+    @staticmethod
+    def parse(request):
+        if not isinstance(request, dict):
+            raise Exception('Request must be a JSON object')
+        if 'processing' in request:
+            processing = np.asarray(request['processing'], dtype=float)
+        elif 'initial_queue' in request:
+            processing = np.asarray(request['initial_queue'], dtype=float).T
+        else:
+            raise Exception('Request has no processing times')
+        if processing.ndim != 2 or processing.shape[0] == 0 or processing.shape[1] < 2:
+            raise Exception('Processing times must be a non-empty matrix of at least 2 machines')
+        if not np.all(np.isfinite(processing)) or np.any(processing < 0):
+            raise Exception('Processing times must be finite and non-negative')
+        unknown = set(request) - set(OPTIONS) - {'processing', 'initial_queue'}
+        if unknown:
+            raise Exception('Unknown options: %s' % ', '.join(sorted(unknown)))
+        options = {i: request[i] for i in OPTIONS if i in request}
+        return np.ascontiguousarray(processing), options
+
+    @staticmethod
+    def key(processing, options):
+        # Cache key of the solution and the budget, a result cut by its budget only answers the same budget
+        improvement = None
+        if options.get('improvement'):
+            improvement = (options['improvement'], options.get('iterations', 100), options.get('seed', 0))
+        solution = SolutionCache.key(processing, 'service', options.get('alter_method', False),
+                                     options.get('exact_method', 'branch_and_bound'), options.get('method'),
+                                     improvement)
+        return solution, options.get('time_limit'), options.get('node_limit')
+
+    async def __dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            processing, options, future = await self.queue.get()
+            try:
+                self.counters['solves'] += 1
+                result = await loop.run_in_executor(self.executor, solve_processing, processing, options)
+                if not future.done():
+                    future.set_result(result)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.set_exception(Exception('Service stopped'))
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(Exception(str(e)))
+            finally:
+                self.queue.task_done()
+
+    async def handle(self, reader, writer):
+        # One request per connection
+        try:
+            status, body = await self.__respond(reader)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            status, body = 400, {'error': 'Malformed request'}
+        payload = json.dumps(body).encode()
+        writer.write(('HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n'
+                      'Connection: close\r\n\r\n' % (status, STATUS_TEXT[status], len(payload))).encode() + payload)
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def __respond(self, reader):
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            return 400, {'error': 'Malformed request'}
+        method, path = request_line[0], request_line[1]
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length', 0))
+        if length > self.max_body:
+            return 413, {'error': 'Request body is too large'}
+        body = await reader.readexactly(length) if length else b''
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/stats':
+            return 200, self.stats()
+        if path != '/solve':
+            return 404, {'error': 'Not found'}
+        if method != 'POST':
+            return 405, {'error': 'Use POST'}
+        try:
+            return 200, await self.solve(json.loads(body))
+        except ServiceBusy as e:
+            return 503, {'error': str(e)}
+        except Exception as e:
+            return 400, {'error': str(e)}
+
+    async def serve(self, host='127.0.0.1', port=8080, unix_path=None, ready=None):
+        # Serves until cancelled, the ready event (an asyncio.Event) is set once connections are accepted
+        await self.start()
+        try:
+            if unix_path is not None:
+                server = await asyncio.start_unix_server(self.handle, unix_path)
+            else:
+                server = await asyncio.start_server(self.handle, host, port)
+            async with server:
+                if ready is not None:
+                    ready.set()
+                await server.serve_forever()
+        finally:
+            await self.close()
+
+
+async def request(method, path, body=None, host='127.0.0.1', port=8080, unix_path=None):
+    # Minimal client: (status, JSON body) of one request
+    if unix_path is not None:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    payload = b'' if body is None else json.dumps(body).encode()
+    writer.write(('%s %s HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n'
+                  'Connection: close\r\n\r\n' % (method, path, host, len(payload))).encode() + payload)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(content)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local JSON over HTTP scheduling service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('-p', '--port', type=int, default=8080)
+    parser.add_argument('-u', '--unix', help='listen on the Unix socket instead of TCP')
+    parser.add_argument('-j', '--workers', type=int, default=0, help='solver processes, 0 for all cores')
+    parser.add_argument('-q', '--queue-size', type=int, default=64,
+                        help='distinct solves waiting for a worker before requests are rejected with 503')
+    args = parser.parse_args(argv)
+    service = SchedulingService(args.workers or None, args.queue_size)
+    try:
+        asyncio.run(run(service, args.host, args.port, args.unix))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    return 0
+
+
+async def run(service, host, port, unix_path):
+    # SIGTERM stops the service as Ctrl+C does, workers are shut down on the way out
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass
+    await service.serve(host, port, unix_path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
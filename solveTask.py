@@ -0,0 +1,42 @@
+from PyQt5 import QtCore
+from johnson import Johnson
+import threading
+
+
+class SolveSignals(QtCore.QObject):
+    progress = QtCore.pyqtSignal(int, float)
+    finished = QtCore.pyqtSignal(object, object)
+    failed = QtCore.pyqtSignal()
+    cancelled = QtCore.pyqtSignal()
+
+
+class SolveTask(QtCore.QRunnable):
+    # Runs the optimization off the UI thread, signals are delivered to the UI thread by Qt
+    def __init__(self, cache, detail_items, alter_method):
+        super(SolveTask, self).__init__()
+        self.setAutoDelete(False)
+        self.signals = SolveSignals()
+        self.cache = cache
+        self.detail_items = detail_items
+        self.alter_method = alter_method
+        # Solver of the finished task, it keeps the sequence for later incremental changes
+        self.johnson = None
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            j = Johnson(self.detail_items)
+            opt = self.cache.optimize(j, self.alter_method, progress=self.signals.progress.emit,
+                                      stop=self.cancel_event.is_set)
+            if self.cancel_event.is_set():
+                self.signals.cancelled.emit()
+                return
+            orig_params = self.cache.get_original_params(j)
+            self.johnson = j
+        except Exception:
+            self.signals.failed.emit()
+            return
+        self.signals.finished.emit(opt, orig_params)
@@ -7,26 +7,31 @@ class TableModel(QtCore.QAbstractTableModel):
 
     def __init__(self, data, horizontal_header, vertical_header):
         super(TableModel, self).__init__()
-        self.data_matrix = data
-        self.row_count = max(len(data), len(horizontal_header))
-        self.column_count = len(vertical_header) if len(data) == 0 else max(len(horizontal_header), len(data[0]))
-        for i in range(len(self.data_matrix)):
-            self.data_matrix[i] += [0 for _ in range(len(self.data_matrix[i]), self.column_count)]
-        self.data_matrix += [[0 for _ in range(self.column_count)] for _ in range(len(self.data_matrix), self.row_count)]
-
-        vertical_header += [str(i) for i in range(len(vertical_header), self.column_count)]
-        horizontal_header += [str(i) for i in range(len(horizontal_header), self.row_count)]
-        self.vertical_header = vertical_header
-        self.horizontal_header = horizontal_header
+        data = TableModel.__to_matrix(data)
+        self.row_count = max(data.shape[0], len(horizontal_header))
+        self.column_count = max(len(vertical_header), data.shape[1])
+        # Values live in the top-left corner of a larger buffer, its capacity grows geometrically
+        self.buffer = np.zeros((self.row_count, self.column_count))
+        self.buffer[:data.shape[0], :data.shape[1]] = data
+
+        # Headers are copied, the same lists are often passed to several models
+        self.vertical_header = list(vertical_header) + [str(i) for i in range(len(vertical_header), self.column_count)]
+        self.horizontal_header = list(horizontal_header) + [str(i) for i in range(len(horizontal_header),
+                                                                                   self.row_count)]
+
+    @property
+    def data_matrix(self):
+        return self.buffer[:self.row_count, :self.column_count]
 
     def setData(self, index, value, role: int = ...) -> bool:
         if not index.isValid():
             return False
         if role == QtCore.Qt.EditRole:
+            # Values that are not numbers are kept as NaN, the calculation refuses them
             try:
-                self.data_matrix[index.row()][index.column()] = float(value)
-            except ValueError:
-                self.data_matrix[index.row()][index.column()] = 0
+                self.buffer[index.row(), index.column()] = float(value)
+            except (TypeError, ValueError):
+                self.buffer[index.row(), index.column()] = np.nan
             self.dataChanged.emit(index, index, (QtCore.Qt.EditRole,))
         else:
             return False
@@ -34,10 +39,7 @@ class TableModel(QtCore.QAbstractTableModel):
 
     def data(self, index, role):
         if role == Qt.DisplayRole:
-            try:
-                return round(self.data_matrix[index.row()][index.column()], 2)
-            except TypeError:
-                return self.data_matrix[index.row()][index.column()]
+            return round(float(self.buffer[index.row(), index.column()]), 2)
 
     def rowCount(self, index) -> int:
         return self.row_count
@@ -47,36 +49,32 @@ class TableModel(QtCore.QAbstractTableModel):
 
     def headerData(self, section, orientation, role):
         if role == Qt.DisplayRole:
-            if orientation == Qt.Horizontal:
+            # The view may still ask for sections of a model it has just been switched from
+            if orientation == Qt.Horizontal and section < len(self.vertical_header):
                 return QVariant(self.vertical_header[section])
-            if orientation == Qt.Vertical:
+            if orientation == Qt.Vertical and section < len(self.horizontal_header):
                 return QVariant(self.horizontal_header[section])
         return
 
     def add_columns(self, quantity=0, cols=None, header=None):
-        if cols is None:
-            cols = []
-
-        for i in range(len(cols)):
-            if len(cols[i]) < self.row_count:
-                cols[i] += [0 for _ in range(len(cols[i]), self.row_count)]
-            elif len(cols[i]) > self.row_count:
-                self.data_matrix += [[] for _ in range(self.row_count, len(cols[i]))]
-                self.row_count = len(cols[i])
-        if quantity > len(cols):
-            cols.append([0 for _ in range(self.row_count)])
-        for i in range(len(cols)):
-            for j in range(self.row_count):
-                try:
-                    self.data_matrix[j].append(float(cols[i][j]))
-                except ValueError:
-                    self.data_matrix[j].append(cols[i][j])
+        # cols is a list of columns or a (columns x rows) array, all of them are inserted at once
+        cols = TableModel.__to_matrix([] if cols is None else cols, self.row_count)
+        if cols.shape[1] > self.row_count:
+            self.add_rows(cols.shape[1] - self.row_count)
+        if quantity > cols.shape[0]:
+            cols = np.vstack((cols, np.zeros((quantity - cols.shape[0], cols.shape[1]))))
+        if cols.shape[0] == 0:
+            return self
         if header is None:
             header = []
-        header += [str(self.column_count + i + 1) for i in range(len(header), len(cols))]
+        header += [str(self.column_count + i + 1) for i in range(len(header), cols.shape[0])]
+
+        self.beginInsertColumns(QModelIndex(), self.column_count, self.column_count + cols.shape[0] - 1)
+        self.__reserve(self.row_count, self.column_count + cols.shape[0])
+        self.buffer[:self.row_count, self.column_count:self.column_count + cols.shape[0]] = cols.T
         self.vertical_header += header
-        self.column_count += len(cols)
-        self.layoutChanged.emit()
+        self.column_count += cols.shape[0]
+        self.endInsertColumns()
         return self
 
     def add_column(self, col=None, header=None):
@@ -90,92 +88,130 @@ class TableModel(QtCore.QAbstractTableModel):
         self.add_rows(1, [row], header)
 
     def add_rows(self, quantity, rows=None, header=None):
-        if rows is None:
-            rows = []
-        if quantity > len(rows):
-            rows += [[float(0) for _ in range(self.column_count)] for _ in range(quantity - len(rows))]
-        for row in rows:
-            row += [float(0) for _ in range(len(row), self.column_count)]
-            for i in range(len(row)):
-                try:
-                    row[i] = float(row[i])
-                except ValueError:
-                    row[i] = float(0)
-            self.data_matrix.append(row)
-        self.row_count += quantity
+        rows = TableModel.__to_matrix([] if rows is None else rows, self.column_count)[:, :self.column_count]
+        if quantity > rows.shape[0]:
+            rows = np.vstack((rows, np.zeros((quantity - rows.shape[0], rows.shape[1]))))
+        if rows.shape[0] == 0:
+            return self
         if header is None:
             header = []
-        header += [str(self.row_count + i + 1) for i in range(len(header), len(rows))]
+        header += [str(self.row_count + i + 1) for i in range(len(header), rows.shape[0])]
+
+        self.beginInsertRows(QModelIndex(), self.row_count, self.row_count + rows.shape[0] - 1)
+        self.__reserve(self.row_count + rows.shape[0], self.column_count)
+        self.buffer[self.row_count:self.row_count + rows.shape[0], :self.column_count] = rows
         self.horizontal_header += header
-        self.layoutChanged.emit()
+        self.row_count += rows.shape[0]
+        self.endInsertRows()
         return self
 
     def remove_last_row(self, quantity=1):
         for i in range(quantity):
-            self.remove_row(len(self.data_matrix)-1)
+            self.remove_row(self.row_count - 1)
 
     def remove_row(self, row):
-        if row >= len(self.data_matrix) or row < 0:
+        if row >= self.row_count or row < 0:
             raise Exception('No such index')
-        del self.data_matrix[row]
-        self.row_count -= 1
-        self.layoutChanged.emit()
+        self.__remove_rows(row, row + 1)
 
     def remove_last_row_range(self, quantity):
         if quantity <= 0:
             raise Exception('Starts index must go beyond zero')
-        self.data_matrix = self.data_matrix[:-quantity]
-        self.row_count -= quantity
-        self.layoutChanged.emit()
+        self.__remove_rows(max(self.row_count - quantity, 0), self.row_count)
 
     def remove_row_range(self, starts, ends):
         if starts > ends:
             raise Exception('Start index must be less than end')
-        if ends < len(self.data_matrix):
+        if ends > self.row_count:
             raise Exception('End index exceeds data matrix length')
         if starts < 0:
             raise Exception('Starts index must go beyond zero')
-        self.data_matrix = self.data_matrix[:starts][ends:]
-        self.rowCount -= abs(ends - starts)
-        self.layoutChanged.emit()
+        self.__remove_rows(starts, ends)
 
     def remove_last_column(self):
-        self.remove_column(len(self.data_matrix)-1)
+        self.remove_column(self.column_count - 1)
 
     def remove_last_column_range(self, count):
-        if count <=0:
+        if count <= 0:
             raise Exception('Incorrect range count')
-        for i in range(len(self.data_matrix)):
-            self.data_matrix[i] = self.data_matrix[i][:-count]
-        self.vertical_header = self.vertical_header[:-count]
-        self.column_count -= count
-        self.layoutChanged.emit()
+        self.__remove_columns(max(self.column_count - count, 0), self.column_count)
 
     def remove_column(self, col):
-        for i in range(len(self.data_matrix)):
-            del self.data_matrix[i][col]
-        self.column_count -= 1
-        self.layoutChanged.emit()
+        if col >= self.column_count or col < 0:
+            raise Exception('No such index')
+        self.__remove_columns(col, col + 1)
 
     def flags(self, index: QModelIndex):
         return QtCore.Qt.ItemIsEditable | QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
 
     def set_data(self, index, value, role):
         try:
-            self.data_matrix[index.row()][index.column()] = float(value)
+            self.buffer[index.row(), index.column()] = float(value)
         except ValueError:
-            self.data_matrix[index.row()][index.column()] = value
+            self.buffer[index.row(), index.column()] = np.nan
         return True
 
     def clear(self):
-        for i in range(len(self.data_matrix)):
-            self.data_matrix[i].clear()
-        self.data_matrix.clear()
+        self.beginResetModel()
+        self.buffer = np.zeros((0, 0))
         self.row_count = 0
         self.column_count = 0
         self.horizontal_header.clear()
         self.vertical_header.clear()
-        self.layoutChanged.emit()
+        self.endResetModel()
 
     def get_data_matrix(self):
-        return np.array(self.data_matrix, dtype=object)
\ No newline at end of file
+        # A view into the model: it follows edits until the next insertion reallocates the buffer
+        return self.data_matrix
+
+    def __reserve(self, rows, columns):
+        if rows <= self.buffer.shape[0] and columns <= self.buffer.shape[1]:
+            return
+        if columns > self.buffer.shape[1]:
+            columns = max(columns, 2 * self.buffer.shape[1])
+        buffer = np.zeros((max(rows, self.buffer.shape[0]), max(columns, self.buffer.shape[1])))
+        buffer[:self.row_count, :self.column_count] = self.data_matrix
+        self.buffer = buffer
+
+    def __remove_rows(self, starts, ends):
+        if starts == ends:
+            return
+        self.beginRemoveRows(QModelIndex(), starts, ends - 1)
+        self.buffer[starts:self.row_count - (ends - starts)] = self.buffer[ends:self.row_count]
+        del self.horizontal_header[starts:ends]
+        self.row_count -= ends - starts
+        self.endRemoveRows()
+
+    def __remove_columns(self, starts, ends):
+        if starts == ends:
+            return
+        self.beginRemoveColumns(QModelIndex(), starts, ends - 1)
+        self.buffer[:, starts:self.column_count - (ends - starts)] = self.buffer[:, ends:self.column_count]
+        del self.vertical_header[starts:ends]
+        self.column_count -= ends - starts
+        self.endRemoveColumns()
+
+    @staticmethod
+    def __to_matrix(rows, width=0):
+        # Float matrix from an array or from ragged lists, short rows are padded with zeros
+        # and values that are not numbers become NaN
+        if isinstance(rows, np.ndarray) and rows.ndim == 2:
+            rows = rows.astype(float)
+            if rows.shape[1] < width:
+                rows = np.hstack((rows, np.zeros((rows.shape[0], width - rows.shape[1]))))
+            return rows
+        try:
+            matrix = np.array(rows, dtype=float)
+            if matrix.ndim == 2:
+                return TableModel.__to_matrix(matrix, width)
+        except (TypeError, ValueError):
+            pass
+        width = max([width] + [len(i) for i in rows])
+        matrix = np.zeros((len(rows), width))
+        for i in range(len(rows)):
+            for j in range(len(rows[i])):
+                try:
+                    matrix[i, j] = float(rows[i][j])
+                except (TypeError, ValueError):
+                    matrix[i, j] = np.nan
+        return matrix
@@ -0,0 +1,26 @@
+import numpy as np
+from cache import SolutionCache
+from flowshop import FlowShopInstance
+from instrumentation import Instrumentation
+from johnson import Johnson
+
+PROCESSING = [[3, 2, 4], [1, 5, 2], [4, 1, 3], [2, 2, 5]]
+
+
+def test_hit_carries_no_stats():
+    cache = SolutionCache()
+    first = cache.optimize(Johnson(FlowShopInstance(PROCESSING)), False, instrumentation=Instrumentation())
+    assert 'stats' in first
+    second = cache.optimize(Johnson(FlowShopInstance(PROCESSING)), False)
+    assert 'stats' not in second
+    assert cache.hits == 1
+    assert second['makespan'] == first['makespan']
+
+
+def test_memory_and_disk_hits_match(tmp_path):
+    cache = SolutionCache(path=str(tmp_path))
+    cache.optimize(Johnson(FlowShopInstance(PROCESSING)), False, instrumentation=Instrumentation())
+    memory = cache.optimize(Johnson(FlowShopInstance(PROCESSING)), False)
+    disk = SolutionCache(path=str(tmp_path)).optimize(Johnson(FlowShopInstance(PROCESSING)), False)
+    assert sorted(memory) == sorted(disk)
+    assert np.array_equal(memory['sequence'], disk['sequence'])
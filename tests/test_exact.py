@@ -0,0 +1,26 @@
+import numpy as np
+import schedule
+from exact import BranchAndBound, SubsetDynamicProgramming
+
+
+def test_node_limited_dynamic_programming_improves_on_the_incumbent():
+    processing = np.random.default_rng(0).integers(1, 100, (20, 3))
+    incumbent = min(schedule.makespan(processing[i]) for i in BranchAndBound.johnson_sequences(processing))
+    optimum = BranchAndBound(processing).solve()['makespan']
+    result = SubsetDynamicProgramming(processing, node_limit=500).solve()
+    assert result['stopped']
+    assert 0 < result['nodes'] <= 600
+    assert result['makespan'] < incumbent
+    assert result['lower_bound'] <= optimum <= result['makespan']
+    assert sorted(result['sequence']) == list(range(20))
+
+
+def test_node_limited_dynamic_programming_bounds_hold():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        processing = rng.integers(1, 30, (int(rng.integers(3, 9)), 3))
+        optimum = SubsetDynamicProgramming(processing).solve()['makespan']
+        for node_limit in (1, 10, 100):
+            result = SubsetDynamicProgramming(processing, node_limit=node_limit).solve()
+            assert result['makespan'] == schedule.makespan(processing[result['sequence']])
+            assert result['lower_bound'] <= optimum <= result['makespan']
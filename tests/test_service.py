@@ -0,0 +1,58 @@
+import asyncio
+import numpy as np
+from service import SchedulingService, ServiceBusy, request
+
+
+def instance(seed, **options):
+    # 3 machines without Johnson's conditions, solved by the exact search
+    return dict(processing=np.random.default_rng(seed).integers(1, 20, (8, 3)).tolist(), **options)
+
+
+async def solve_all(service, requests):
+    await service.start()
+    try:
+        return await asyncio.gather(*[service.solve(i) for i in requests], return_exceptions=True)
+    finally:
+        await service.close()
+
+
+def test_identical_requests_share_a_solve():
+    service = SchedulingService(workers=1, queue_size=1)
+    results = asyncio.run(solve_all(service, [instance(0)] * 3))
+    assert all(i == results[0] for i in results)
+    assert service.counters['solves'] == 1
+    assert service.counters['coalesced'] == 2
+
+
+def test_idle_workers_take_requests_before_rejection():
+    service = SchedulingService(workers=2, queue_size=2)
+    results = asyncio.run(solve_all(service, [instance(i) for i in range(4)]))
+    assert not any(isinstance(i, Exception) for i in results)
+    service = SchedulingService(workers=2, queue_size=2)
+    results = asyncio.run(solve_all(service, [instance(i) for i in range(6)]))
+    assert sum(isinstance(i, ServiceBusy) for i in results) == 2
+    assert service.counters['rejected'] == 2
+
+
+def test_busy_service_answers_503(tmp_path):
+    path = str(tmp_path / 'service.sock')
+
+    async def run():
+        service = SchedulingService(workers=1, queue_size=1)
+        ready = asyncio.Event()
+        server = asyncio.create_task(service.serve(unix_path=path, ready=ready))
+        await ready.wait()
+        try:
+            # Enumerating every order keeps the solves running while the requests arrive
+            responses = await asyncio.gather(*[request('POST', '/solve', instance(i, exact_method='brute_force'),
+                                                       unix_path=path)
+                                               for i in range(3)])
+            stats = await request('GET', '/stats', unix_path=path)
+        finally:
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+        return responses, stats
+
+    responses, (_, stats) = asyncio.run(run())
+    assert sorted(status for status, _ in responses) == [200, 200, 503]
+    assert stats['rejected'] == 1
@@ -3,15 +3,20 @@ from serializer import Serializer
 from mainForm import Ui_mainForm
 from tableModel import TableModel
 from johnson import Johnson, DetailItem
-from PyQt5.QtGui import QPixmap
-import matplotlib
-import matplotlib.pyplot as plt
-import string
+from flowshop import MACHINES_COUNT_VARIANTS
+from cache import SolutionCache
+from solveTask import SolveTask
+from PyQt5.QtGui import QPixmap, QImage
+from PyQt5 import QtCore
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import to_rgba_array
 import math
 import os
-import random as rand
 import numpy as np
-matplotlib.use('Agg')
+
+RESULT_TITLE = 'Результат оптимизации'
 
 
 class Window(QtWidgets.QMainWindow):
@@ -22,15 +27,29 @@ class Window(QtWidgets.QMainWindow):
 
         self.data = {
             'initial_queue': [],
-            'machines_count_variants': ['2', '3'],
+            'machines_count_variants': list(MACHINES_COUNT_VARIANTS),
             'machines_count_selected_index': 0,
             'details_count': 0
         }
         self.previous_calculated_flag = False
+        self.solution_cache = SolutionCache()
+        self.solve_task = None
+        # Solver of the last calculated queue, single part edits of that queue are rescheduled by it
+        self.johnson = None
+        self.solved_queue = None
+        self.solving_queue = None
+        # One figure and Agg canvas are reused by every diagram, nothing is written to disk unless exported
+        self.figure = Figure()
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.gantt = self.figure.add_subplot()
         self.setup_data()
         self.ui.machineCount.currentIndexChanged.connect(self.machine_count_changed)
         self.ui.detailsCount.valueChanged.connect(self.details_count_changed)
         self.ui.startCalculationButton.clicked.connect(self.calculate)
+        self.ui.cancelCalculationButton.clicked.connect(self.cancel_calculation)
+        self.ui.cancelCalculationButton.setVisible(False)
+        self.ui.exportDiagramButton.clicked.connect(self.export_plot)
+        self.ui.exportDiagramButton.setEnabled(False)
         self.ui.loadButton.clicked.connect(self.load_from_file)
         self.ui.saveButton.clicked.connect(self.save_to_file)
 
@@ -41,15 +60,15 @@ class Window(QtWidgets.QMainWindow):
         else:
             self.ui.initialQueueTableView.model().remove_last_column_range(abs(delta_count))
         self.data['details_count'] = self.ui.detailsCount.value()
-        self.ui.initialQueueTableView.resizeColumnsToContents()
+        self.resize_columns(self.ui.initialQueueTableView)
 
     def machine_count_changed(self):
         selected_count = self.ui.machineCount.currentIndex()
-        delta_count = selected_count - self.data['machines_count_selected_index']
         previous_selected_value = int(self.data['machines_count_variants'][self.data['machines_count_selected_index']])
         current_selected_value = int(self.data['machines_count_variants'][selected_count])
+        delta_count = current_selected_value - previous_selected_value
         self.ui.alterMethodCheckBox.setVisible(True if
-                                               int(self.data['machines_count_variants'][selected_count]) > 2 else False)
+                                               int(self.data['machines_count_variants'][selected_count]) == 3 else False)
         if delta_count > 0:
             self.ui.initialQueueTableView.model().add_rows(delta_count, None,
                                                            ['T%s' % str(i + 1) for i in
@@ -57,7 +76,7 @@ class Window(QtWidgets.QMainWindow):
             self.ui.optimizedQueueTableView.model().add_rows(delta_count, None,
                                                            ['T%s' % str(i + 1) for i in
                                                             range(previous_selected_value, current_selected_value)])
-        else:
+        elif delta_count < 0:
             self.ui.initialQueueTableView.model().remove_last_row_range(abs(delta_count))
             self.ui.optimizedQueueTableView.model().remove_last_row_range(abs(delta_count))
         self.data['machines_count_selected_index'] = selected_count
@@ -72,7 +91,10 @@ class Window(QtWidgets.QMainWindow):
                 return
             else:
                 load_file_data_path = load_file_data[0]
-                self.data = Serializer.deserialize(load_file_data_path)
+                self.data = Serializer.deserialize(load_file_data_path, mmap=False)
+                # Files saved with fewer variants keep their selected index, missing counts are appended
+                self.data['machines_count_variants'] += [i for i in MACHINES_COUNT_VARIANTS
+                                                         if i not in self.data['machines_count_variants']]
                 self.setup_data()
         except:
             QtWidgets.QMessageBox.critical(self, 'Error', 'Загрузка невозможна')
@@ -113,10 +135,11 @@ class Window(QtWidgets.QMainWindow):
                                           range(int(self.data['machines_count_variants']
                                                     [self.data['machines_count_selected_index']]))]
         self.ui.initialQueueTableView.setModel(TableModel(self.data['initial_queue'], horizontal_header, vertical_header))
-        self.ui.initialQueueTableView.resizeColumnsToContents()
+        self.resize_columns(self.ui.initialQueueTableView)
         self.ui.alterMethodCheckBox.setVisible(True if int(self.data['machines_count_variants']
-                                                    [self.data['machines_count_selected_index']]) > 2 else False)
+                                                    [self.data['machines_count_selected_index']]) == 3 else False)
         self.ui.optimizedQueueTableView.setModel(TableModel([], horizontal_header, []))
+        self.ui.groupBox_2.setTitle(RESULT_TITLE)
 
     def calculate(self):
         if self.previous_calculated_flag:
@@ -127,56 +150,165 @@ class Window(QtWidgets.QMainWindow):
                                  range(int(self.data['machines_count_variants']
                                            [self.data['machines_count_selected_index']]))]
             self.ui.optimizedQueueTableView.setModel(TableModel([], horizontal_header, []))
+            self.ui.groupBox_2.setTitle(RESULT_TITLE)
         self.update_data()
         if self.data['details_count'] < 2:
             QtWidgets.QMessageBox.critical(self, 'Error', 'Недостаточное количество деталей для расчета')
             return
-        for i in self.data['initial_queue']:
-            if len(list(filter(lambda x: not type(x) is float or x < 0, i))) > 0:
-                QtWidgets.QMessageBox.critical(self, 'Error', 'Некоторые значения заданы неверно')
-                return
+        # Cells that could not be read as numbers are kept as NaN by the model
+        if not np.all(np.isfinite(self.data['initial_queue'])) or np.any(self.data['initial_queue'] < 0):
+            QtWidgets.QMessageBox.critical(self, 'Error', 'Некоторые значения заданы неверно')
+            return
+        queue = np.array(self.data['initial_queue'], dtype=float)
         try:
+            opt = self.reschedule(queue)
+            if opt is not None:
+                self.solved_queue = queue
+                self.calculation_finished(opt, self.johnson.get_original_params())
+                return
             detail_items = DetailItem.create_from_multiple_list(self.data['initial_queue'])
-            j = Johnson(detail_items)
-            opt = j.optimize(self.ui.alterMethodCheckBox.isChecked())
-            orig_params = j.get_original_params()
         except Exception:
+            self.johnson = None
             QtWidgets.QMessageBox.critical(self, 'Error', 'Произошла ошибка при вычислениях')
             return
+        self.johnson = None
+        self.solving_queue = queue
+        self.solve_task = SolveTask(self.solution_cache, detail_items, self.ui.alterMethodCheckBox.isChecked())
+        self.solve_task.signals.progress.connect(self.calculation_progress)
+        self.solve_task.signals.finished.connect(self.calculation_finished)
+        self.solve_task.signals.failed.connect(self.calculation_failed)
+        self.solve_task.signals.cancelled.connect(self.calculation_cancelled)
+        self.set_calculation_running(True)
+        QtCore.QThreadPool.globalInstance().start(self.solve_task)
+
+    def reschedule(self, queue):
+        # One edited, added or removed part of the last calculated queue is placed into its sequence
+        # instead of solving again, None when the queue changed otherwise
+        if self.johnson is None or self.johnson.alter_method != self.ui.alterMethodCheckBox.isChecked() or \
+                queue.shape[0] != self.solved_queue.shape[0]:
+            return None
+        opt = None
+        if queue.shape == self.solved_queue.shape:
+            changed = np.flatnonzero((queue != self.solved_queue).any(axis=0))
+            if len(changed) == 1:
+                opt = self.johnson.update(int(changed[0]), queue[:, changed[0]])
+        elif queue.shape[1] == self.solved_queue.shape[1] + 1 and np.array_equal(queue[:, :-1], self.solved_queue):
+            opt = self.johnson.insert(queue[:, -1])
+        elif queue.shape[1] == self.solved_queue.shape[1] - 1 and np.array_equal(queue, self.solved_queue[:, :-1]):
+            opt = self.johnson.remove(queue.shape[1])
+        # Without Johnson's conditions 3 machines queues get an exact search, the best insertion does not
+        # keep its optimum and such queues are solved again in the background
+        if opt is not None and not opt['optimal'] and self.johnson.rule is None and queue.shape[0] == 3:
+            return None
+        return opt
+
+    def set_calculation_running(self, running):
+        self.ui.startCalculationButton.setVisible(not running)
+        self.ui.cancelCalculationButton.setVisible(running)
+        self.ui.cancelCalculationButton.setEnabled(running)
+        self.ui.loadButton.setEnabled(not running)
+        self.ui.saveButton.setEnabled(not running)
+        self.ui.machineCount.setEnabled(not running)
+        self.ui.detailsCount.setEnabled(not running)
+        if running:
+            self.ui.diagramLabel.setText('Выполняется расчет...')
+            self.ui.diagramLabel.adjustSize()
+        else:
+            self.solve_task = None
+
+    def cancel_calculation(self):
+        if self.solve_task is not None:
+            self.solve_task.cancel()
+            self.ui.cancelCalculationButton.setEnabled(False)
+
+    def calculation_progress(self, nodes, best_makespan):
+        self.ui.diagramLabel.setText('Просмотрено вершин: %d, лучшая длительность: %g' % (nodes, best_makespan))
+        self.ui.diagramLabel.adjustSize()
+
+    def calculation_finished(self, opt, orig_params):
+        if self.solve_task is not None:
+            self.johnson = self.solve_task.johnson
+            self.solved_queue = self.solving_queue
+        self.set_calculation_running(False)
         try:
             self.output_result(opt['path'], opt['params'], orig_params)
+            self.show_quality(opt)
         except Exception:
             QtWidgets.QMessageBox.critical(self, 'Error', 'Ошибка вывода значений')
             return
         self.previous_calculated_flag = True
 
-    def output_result(self, result_sequence, result_params, orig_params=None):
-        for i in result_sequence:
-            self.ui.optimizedQueueTableView.model().add_column(i.machines_processing, [i.name])
+    def show_quality(self, opt):
+        # Sequences not proven optimal (heuristics, interrupted searches) show their gap to the lower bound
+        if opt['optimal']:
+            quality = 'оптимальная длительность %g' % opt['makespan']
+        else:
+            quality = 'длительность %g, отклонение от нижней оценки не более %.1f%%' % (opt['makespan'],
+                                                                                     100 * opt['gap'])
+        self.ui.groupBox_2.setTitle('%s: %s' % (RESULT_TITLE, quality))
+
+    def calculation_failed(self):
+        self.set_calculation_running(False)
+        QtWidgets.QMessageBox.critical(self, 'Error', 'Произошла ошибка при вычислениях')
+
+    def calculation_cancelled(self):
+        self.set_calculation_running(False)
+        self.ui.diagramLabel.setText('Расчет отменен')
+        self.ui.diagramLabel.adjustSize()
 
-        self.ui.optimizedQueueTableView.model().add_column([result_params[str(i)]['sum_delay']
-                                                            for i in range(len(result_params))], ['DT'])
-        self.ui.optimizedQueueTableView.model().add_column([result_params[str(i)]['sum_working']
-                                                            for i in range(len(result_params))], ['UT'])
+    def closeEvent(self, event):
+        if self.solve_task is not None:
+            self.solve_task.cancel()
+            QtCore.QThreadPool.globalInstance().waitForDone()
+        super(Window, self).closeEvent(event)
 
+    def output_result(self, result_sequence, result_params, orig_params=None):
+        # Every column of the result goes into the model with a single insertion
+        columns = [i.machines_processing for i in result_sequence]
+        header = [i.name for i in result_sequence]
+        totals = result_params.columns()
+        columns.append(totals['sum_delay'])
+        columns.append(totals['sum_working'])
+        header += ['DT', 'UT']
         if orig_params:
-            self.ui.optimizedQueueTableView.model().add_column([orig_params[str(i)]['sum_delay']
-                                                                for i in range(len(result_params))], ['SDT'])
-            self.ui.optimizedQueueTableView.model().add_column([orig_params[str(i)]['sum_working']
-                                                                for i in range(len(result_params))], ['SUT'])
-        self.ui.optimizedQueueTableView.resizeColumnsToContents()
-
-        file_diagram = self.draw_plot(result_params)
-        pixmap = QPixmap(file_diagram)
+            totals = orig_params.columns()
+            columns.append(totals['sum_delay'])
+            columns.append(totals['sum_working'])
+            header += ['SDT', 'SUT']
+        self.ui.optimizedQueueTableView.model().add_columns(len(columns), np.array(columns, dtype=float),
+                                                             [str(i) for i in header])
+        self.resize_columns(self.ui.optimizedQueueTableView)
+
+        pixmap = self.draw_plot(result_params)
         self.ui.diagramLabel.setEnabled(True)
         self.ui.diagramLabel.setPixmap(pixmap)
         self.ui.diagramLabel.resize(pixmap.width(), pixmap.height())
+        self.ui.exportDiagramButton.setEnabled(True)
+
+    @staticmethod
+    def resize_columns(view, measured_count=200):
+        # Measuring every column of a long schedule takes seconds, the width of a sample is used for all of them
+        columns_count = view.model().columnCount(None)
+        if columns_count <= measured_count:
+            view.resizeColumnsToContents()
+            return
+        header = view.horizontalHeader()
+        width = max(max(view.sizeHintForColumn(i), header.sectionSizeHint(i)) for i in range(measured_count))
+        header.setDefaultSectionSize(width)
+        for i in range(columns_count):
+            if header.sectionSize(i) != width:
+                header.resizeSection(i, width)
 
     def draw_plot(self, units):
-        fig, gnt = plt.subplots()
+        gnt = self.gantt
+        gnt.clear()
+
+        columns = units.columns()
+        starts = list(columns['activity_starts'].T)
+        durations = list(columns['activity_duration'].T)
 
         y_lim = 100
-        x_lim = max([max([i['activity']['starts'] + i['activity']['duration'] for i in units[unit]['tasks']]) for unit in units])
+        x_lim = max([(i + j).max() for i, j in zip(starts, durations) if len(i)] + [1])
 
         gnt.set_ylim(0, y_lim)
         gnt.set_xlim(0, x_lim)
@@ -198,29 +330,40 @@ class Window(QtWidgets.QMainWindow):
             'tab:olive',
             'tab:cyan',
         ]
+        # Colors are converted once, every bar then takes a row of the RGBA palette
+        palette = to_rgba_array(available_colors)
         spacing = math.floor(y_lim / len(units))
-        position = [(spacing * int(i / spacing), spacing - 2) for i in range(y_lim) if i % spacing == 0]
-        y_ticks = [(int(i / spacing) + 0.5) * spacing - 1 for i in range(y_lim - 1) if i % spacing == 0]
 
         x_step = int(x_lim / 10) if int(x_lim / 10) >= 3 else 1
-        x_ticks = [i for i in range(math.ceil(x_lim)) if i % x_step == 0]
-
-        gnt.set_yticks(y_ticks)
-        gnt.set_xticks(x_ticks)
-
-        y_labels = []
-        iters = 0
-        colors_scheme = tuple((available_colors[i % len(available_colors)] for i in range(self.ui.detailsCount.value())))
-        for i in units.values():
-            barh_data = list([(x['activity']['starts'], x['activity']['duration']) for x in i['tasks']])
-            gnt.broken_barh(barh_data, position[iters], facecolors=colors_scheme)
-            y_labels.append(str(iters+1))
-            iters += 1
-        gnt.set_yticklabels(y_labels)
-
-        filename = './plots/' + ''.join([rand.choice(string.ascii_lowercase) for i in range(10)]) + '.png'
-        if not os.path.exists(os.path.dirname(filename)):
-            os.mkdir(os.path.dirname(filename))
-        plt.savefig(filename)
-        return filename
+        gnt.set_yticks([(i + 0.5) * spacing - 1 for i in range(len(units))])
+        gnt.set_xticks(np.arange(0, math.ceil(x_lim), x_step))
+
+        for i in range(len(units)):
+            # Every bar of the machine is one rectangle of a single collection
+            bottom = spacing * i
+            top = bottom + spacing - 2
+            left = starts[i]
+            right = starts[i] + durations[i]
+            verts = np.empty((len(left), 4, 2))
+            verts[:, 0, 0] = verts[:, 3, 0] = left
+            verts[:, 1, 0] = verts[:, 2, 0] = right
+            verts[:, 0, 1] = verts[:, 1, 1] = bottom
+            verts[:, 2, 1] = verts[:, 3, 1] = top
+            colors = palette[np.arange(len(left)) % len(palette)]
+            gnt.add_collection(PolyCollection(verts, facecolors=colors))
+        gnt.set_yticklabels([str(i + 1) for i in range(len(units))])
 
+        self.canvas.draw()
+        width, height = self.canvas.get_width_height()
+        image = QImage(self.canvas.buffer_rgba(), width, height, QImage.Format_RGBA8888)
+        return QPixmap.fromImage(image.copy())
+
+    def export_plot(self):
+        try:
+            export_file_path = QtWidgets.QFileDialog.getSaveFileName(self, 'Export diagram...',
+                                                                     os.path.dirname(os.getcwd()),
+                                                                     'Images (*.png *.svg *.pdf)')[0]
+            if export_file_path:
+                self.figure.savefig(export_file_path)
+        except (OSError, ValueError):
+            QtWidgets.QMessageBox.critical(self, 'Error', 'Во время сохранения диаграммы произошла ошибка')